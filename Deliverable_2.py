@@ -6,218 +6,207 @@
 
 # Miller–Rabin implementation, testing, plotting, and base‐impact analysis experiments:
 
-import math
-import random
-from collections import defaultdict, deque
-import matplotlib.pyplot as plt
-import progressbar
-
-# 1. Generate prime list via sieve of Eratosthenes (100–1_000_000)
-def sieve(n):
-    sieve = [True] * (n+1)
-    sieve[0:2] = [False, False]
-    for p in range(2, int(n**0.5)+1):
-        if sieve[p]:
-            for multiple in range(p*p, n+1, p):
-                sieve[multiple] = False
-    return [i for i, is_prime in enumerate(sieve) if is_prime]
-
-PRIMES = sieve(10_000_000)
-PRIME_SET = set(PRIMES)
-
-# 2. Miller‑Rabin test
-def miller_rabin(n, bases=None, k=5):
-    """Return False for composite, True for probably prime."""
-    if n < 2:
-        return False
-    # small primes check
-    for p in [2,3,5,7,11,13,17,19,23,29]:
-        if n == p:
-            return True
-        if n % p == 0:
-            return False
-    # write n-1 = d * 2^s
-    d, s = n-1, 0
-    while d % 2 == 0:
-        d //= 2
-        s += 1
-
-    # Alternative method doesn't take advantage of %n improvements each iteration so is much longer for large "n":
+import argparse
+import functools
+import sys
+
+import instrumentation
+import mr_scan
+import plots
+import prime_table
+import result_store
+import rolling_stats
+import sprp_cache
+from primality import miller_rabin
+
+# Default number of processes the Miller-Rabin sweeps are sharded over (--workers).
+WORKERS = 1
+
+# Default largest n of both tasks (--max-n). Up to prime_table.TABLE_LIMIT the ground truth is a cached table; above
+# it each window of the scans is sieved as it is reached. The per-base bitmaps of sprp_cache are also read and written
+# a window at a time through memory maps, so memory does not grow with max_n (any value up to 10^10 and beyond works);
+# disk does, by max_n / 16 bytes per base cached (625 MB per base at 10^10).
+MAX_N = 10_000_000
+
+ROLLING_WINDOW = 100_000
+ROLLING_BASES = [2,7,61] #try just [2] also
+ROLLING_POINTS = 10_000
+BASES_TO_TEST = [2,3,4,5,10,11,12,16,17,19,25,29,31,32]
+
+
+# 1. Prime table (odd-only bitmap, sieved once then memory-mapped from the cache) for the ground truth. Built on first
+# use (only when a base has no cached bitmap yet), so importing this module does not sieve anything.
+@functools.lru_cache(maxsize=None)
+def ground_truth(max_n):
+    with instrumentation.stage("sieve"):
+        return prime_table.ground_truth(max_n)
+
+# Per-base false positive bitmaps over [0, max_n] (sprp_cache.py), computed once per base and kept in .prime_cache/:
+# Task 1 and Task 2 share the bases they have in common, and any base set is an AND of the bitmaps.
+@functools.lru_cache(maxsize=None)
+def sprp_bitmaps(max_n, workers=WORKERS):
+    return sprp_cache.SPRPCache(max_n, workers=workers, ground_truth=ground_truth)
+
+# 2. Miller‑Rabin test: miller_rabin() lives in primality.py so the scan engines can share it
+
+# 3. Unit tests
+def run_unit_tests():
+    # pick some known primes/composites
+    test_primes = [101, 103, 1009, 50021, 999983]
+    test_composites = [100, 102, 1000, 50020, 999981]
+    assert all(miller_rabin(p, bases=[2,7,61]) for p in test_primes)
+    assert all(not miller_rabin(c, bases=[2,7,61]) for c in test_composites)
+
+
+# 4. Task 1: false-positive rolling average
+def rolling_fp(max_n=MAX_N, window=ROLLING_WINDOW, bases=ROLLING_BASES, workers=WORKERS, store=None):
     """
-    if bases is None:
-        bases = [random.randrange(2, n-1) for _ in range(k)]
-    for a in bases:
-        spp = False
-        x1 = pow(a, d)
-        x = x1 % n
-        if x == 1 or x == n-1:
-            spp = True
-        if not spp:
-            for _ in range(s-1):
-                x1 = pow(x1, 2)
-                x2 = x1 % n
-                if x2 == n-1:
-                    spp = True
-                    break
-        if not spp:
-            return False
-    return True
+    Rolling false-positive rate of miller_rabin(n, bases) over n in [100, max_n], plotted.
+    Results are kept in `store` (results/ by default) so rerunning (or render.py) does not recompute them.
     """
-    # choose bases
-    if bases is None:
-        bases = [random.randrange(2, n - 1) for _ in range(k)]
-    for a in bases:
-        x = pow(a, d, n)
-        if x == 1 or x == n - 1:
-            continue
-        for _ in range(s - 1):
-            x = pow(x, 2, n)
-            if x == n - 1:
-                break
+    store = store or result_store.ResultStore()
+    rolling_params = {"max_n": max_n, "window": window, "bases": bases, "points": ROLLING_POINTS}
+    with instrumentation.stage("task1.rolling_fp"):
+        stored = store.load("rolling_fp", rolling_params)
+        if stored is not None:
+            ns, rolling = stored[0]["n"], stored[0]["rolling"]
         else:
-            return False
-    return True
+            # AND of the bases' cached bitmaps; bases not cached yet are scanned once, in contiguous shards run on
+            # `workers` processes (the result does not depend on it)
+            bar = instrumentation.progress_bar(max_n + 1)
+            fp_ns = sprp_bitmaps(max_n, workers).false_positives(bases, 100, max_n+1, progress=bar.update)
 
+            # compute rolling average: the 0/1 false-positive flags are streamed through the window chunk by chunk and
+            # the rate is kept at ROLLING_POINTS evenly spaced n, so nothing of size max_n is held in memory
+            step = max((max_n+1 - 100) // ROLLING_POINTS, 1)
+            ns, rolling = rolling_stats.rolling_rate(rolling_stats.flag_chunks(fp_ns, 100, max_n+1), window, step=step,
+                                                     start=100)
+            store.save("rolling_fp", rolling_params, {"n": ns, "rolling": rolling, "fp_ns": fp_ns})
 
-# 3. Unit tests
-# pick some known primes/composites
-test_primes = [101, 103, 1009, 50021, 999983]
-test_composites = [100, 102, 1000, 50020, 999981]
-assert all(miller_rabin(p, bases=[2,7,61]) for p in test_primes)
-assert all(not miller_rabin(c, bases=[2,7,61]) for c in test_composites)
+    # plot
+    with instrumentation.stage("plotting"):
+        plots.rolling_false_positive_rate(ns, rolling, window, bases)
+    plots.show("rolling_fp")
 
-# 4. Task 1: false-positive rolling average
-max_n = 10_000_000
-window = 100_000
-fps = []  # 1 if false positive at n, else 0
-ns = []
-for n in range(100, max_n+1):
-    if n in PRIME_SET:
-        # skip true primes
-        fps.append(0)
-    else:
-        fps.append(1 if miller_rabin(n, bases=[2,7,61]) else 0) # ,7,61
-    ns.append(n)
-
-# compute rolling average
-rolling = []
-dq = deque()
-sum_fp = 0
-for i, val in enumerate(fps):
-    dq.append(val)
-    sum_fp += val
-    if len(dq) > window:
-        sum_fp -= dq.popleft()
-    rolling.append(sum_fp / len(dq))
-
-# plot
-plt.figure()
-plt.plot(ns, rolling)
-plt.xlabel("n")
-plt.ylabel(f"False-positive rate (window={window})")
-plt.title("Rolling false-positive rate of Miller–Rabin (bases [2, 7, 61])") #try just [2] also
-plt.tight_layout()
-plt.show()
 
 # 5. Task 2: impact of single-base tests
-bases_to_test = [2,3,4,5,10,11,12,16,17,19,25,29,31,32]
-
-
-false_counts_all = {}
-for ix, a in enumerate(bases_to_test):
-    count = 0
-    for n in range(100, int(max_n/100) +1 ):
-        if n not in PRIME_SET and miller_rabin(n, bases=[a]):
-            count += 1
-    if a not in false_counts_all:
-        false_counts_all[a] = [count, 0, 0]
-    else:
-        false_counts_all[a][0] = count
-
-
-bar = progressbar.ProgressBar(max_value=len(bases_to_test))
-for ix, a in enumerate(bases_to_test):
-    count = 0
-    for n in range(100, int(max_n/10) +1 ):
-        if n not in PRIME_SET and miller_rabin(n, bases=[a]):
-            count += 1
-    if a not in false_counts_all:
-        false_counts_all[a] = [0, count, 0]
-    else:
-        false_counts_all[a][1] = count
-    bar.update(ix + 1)
-
-
-liars_ranking = {}
-bar = progressbar.ProgressBar(max_value=len(bases_to_test))
-for ix, a in enumerate(bases_to_test):
-    count = 0
-    for n in range(100, max_n+1):
-        if n not in PRIME_SET and miller_rabin(n, bases=[a]):
-            count += 1
-            if n not in liars_ranking:
-                liars_ranking[n] = 1
-            else:
-                liars_ranking[n] += 1
-    if a not in false_counts_all:
-        false_counts_all[a] = [0, 0, count]
-    else:
-        false_counts_all[a][2] = count
-    bar.update(ix + 1)
-
-# print summary
-print("False positives by base A:")
-for a, cnt in sorted(false_counts_all.items(), key=lambda x: x[1][2], reverse=True):
-    print(f"Base {a}: {cnt[2]} false positives")
-
-#plot false counts of "A" across the 3 ranges of n to see change/trajectory:
-plt.figure()
-plot_count = 0
-for a, cnt in sorted(false_counts_all.items(), key=lambda x: x[0], reverse=True):
-    line_type = "-"
-    if plot_count % 2 == 0:
-        line_type = "--"
-    plot_count += 1
-    plt.plot([int(max_n/100), int(max_n/10), max_n], cnt, label=f"Base 'A' = {a}", linestyle=line_type)
-plt.xscale('log')
-plt.xlabel("n (log scale)")
-plt.ylabel(f"FPs by Base 'A's chosen")
-plt.title("Determining which Miller–Rabin 'A' bases yield more FPs")
-#plt.tight_layout()
-plt.legend()
-plt.show()
-
-
-#plot which composite numbers have the most liars
-for n, cnt in sorted(liars_ranking.items(), key=lambda x: x[1], reverse=False):
-    print(f"liar n= {n}, cheating {cnt} of the 'A' bases out of {len(bases_to_test)} possible bases")
-
-all_dicts = []
-
-biggest = 0
-for n, cnt in sorted(liars_ranking.items(), key=lambda x: x[1], reverse=True):
-    biggest = cnt
-    break
-
-for i in range(biggest):
-    filtered_dict = dict(filter(lambda x: x[1] == i+1, liars_ranking.items()))
-    all_dicts.append(len(filtered_dict))
-
-
-categories = list(range(1, biggest + 1))
-values = all_dicts
-
-# Create the bar plot
-plt.bar(categories, values, color='skyblue')
-
-# Add labels and title
-plt.xlabel(f"Number of times a Liar Lies out of {len(bases_to_test)} bases")
-plt.ylabel(f'The Amount of Liars found, 0 to "n" = {max_n}')
-plt.title('Showing Liars That Lie Multiple Times')
-
-# Add value labels on top of bars
-for index, value in enumerate(values):
-    plt.text(index + 1, value + 0.5, str(value), ha='center', va='center')
-
-# Show the plot
-plt.show()
\ No newline at end of file
+def liar_scan(max_n=MAX_N, bases=BASES_TO_TEST, workers=WORKERS, store=None):
+    """
+    The liars of every base up to max_n, from the cached per-base bitmaps (one pass over the odd composites tests the
+    bases not cached yet); the counts for the smaller ranges are prefixes of the same scan. Stored like rolling_fp, so
+    base-impact and liars share one scan.
+    :return: mr_scan.LiarScan
+    """
+    store = store or result_store.ResultStore()
+    liar_params = {"lo": 100, "hi": max_n + 1, "bases": bases}
+    with instrumentation.stage("task2.liar_scan"):
+        stored = store.load("liar_scan", liar_params)
+        if stored is not None:
+            return mr_scan.LiarScan.from_columns(stored[0])
+        bar = instrumentation.progress_bar(max_n + 1)
+        scan = sprp_bitmaps(max_n, workers).scan(bases, 100, max_n + 1, progress=bar.update)
+        store.save("liar_scan", liar_params, scan.columns())
+        return scan
+
+
+def base_impact(max_n=MAX_N, bases=BASES_TO_TEST, workers=WORKERS, store=None):
+    """
+    False positives of each single base at max_n / 100, max_n / 10 and max_n, printed and plotted.
+    """
+    checkpoints = [int(max_n/100), int(max_n/10), max_n]
+    false_counts_all = liar_scan(max_n, bases, workers, store).index().false_counts(checkpoints)
+
+    # print summary
+    print("False positives by base A:")
+    for a, cnt in sorted(false_counts_all.items(), key=lambda x: x[1][2], reverse=True):
+        print(f"Base {a}: {cnt[2]} false positives")
+
+    #plot false counts of "A" across the 3 ranges of n to see change/trajectory:
+    with instrumentation.stage("plotting"):
+        plots.base_false_counts(checkpoints, false_counts_all)
+    plots.show("base_false_counts")
+
+
+def liars(max_n=MAX_N, bases=BASES_TO_TEST, workers=WORKERS, store=None):
+    """
+    Every liar with the number of bases it fools, printed, and the histogram of those numbers.
+    """
+    # every liar with the bitmask of the bases it fools; counts, histogram and queries are array operations on it
+    liar_index = liar_scan(max_n, bases, workers, store).index()
+
+    #plot which composite numbers have the most liars
+    for n, cnt in zip(*(a.tolist() for a in liar_index.by_count())):
+        print(f"liar n= {n}, cheating {cnt} of the 'A' bases out of {len(bases)} possible bases")
+
+    with instrumentation.stage("plotting"):
+        plots.liar_histogram(liar_index.histogram(), len(bases), max_n)
+
+    # Show the plot
+    plots.show("liar_histogram")
+
+
+def base_sets(max_n=MAX_N, sets=([2, 3], [31, 73]), workers=WORKERS):
+    """
+    Number of false positives of miller_rabin(n, bases=set) for n in [100, max_n], for each base set, printed. Only
+    bases without a cached bitmap are scanned; the rest is an AND of bitmaps.
+    :return: {tuple of bases: number of false positives}
+    """
+    counts = {}
+    with instrumentation.stage("base_sets"):
+        cache = sprp_bitmaps(max_n, workers)
+        for bases in sets:
+            counts[tuple(bases)] = len(cache.false_positives(bases, 100, max_n + 1))
+    for bases, count in counts.items():
+        print(f"Bases {list(bases)}: {count} false positives up to {max_n}")
+    return counts
+
+
+def _int_list(text):
+    return [int(v) for v in text.split(",")]
+
+
+def _add_common_options(parser, suppress=False):
+    def default(value):
+        return argparse.SUPPRESS if suppress else value
+    parser.add_argument("--max-n", type=int, default=default(MAX_N), help=f"largest n tested (default {MAX_N})")
+    parser.add_argument("--workers", type=int, default=default(WORKERS),
+                        help=f"processes the range is sharded over (default {WORKERS})")
+    parser.add_argument("--bases", type=_int_list, default=default(None),
+                        help="comma separated Miller-Rabin bases (default: each task's own)")
+
+
+def main(argv=None):
+    """
+    python Deliverable_2.py [rolling-fp | base-impact | liars] [--max-n N] [--window W] [--bases 2,7,61] [--workers K]
+    python Deliverable_2.py base-sets 2,3 31,73 [--max-n N] [--workers K]
+
+    Without a subcommand all three tasks run, in that order, with their default bases.
+    """
+    parser = argparse.ArgumentParser(description="Miller-Rabin false positive and liar experiments (Deliverable 2)")
+    _add_common_options(parser)
+    commands = parser.add_subparsers(dest="command")
+    # options given after the subcommand; SUPPRESS keeps the ones given before it from being reset to the defaults
+    rolling = commands.add_parser("rolling-fp", help="Task 1: rolling false positive rate")
+    rolling.add_argument("--window", type=int, default=ROLLING_WINDOW, help="rolling window width")
+    base = commands.add_parser("base-impact", help="Task 2: false positives of single bases")
+    liar = commands.add_parser("liars", help="Task 2: composites fooling several bases")
+    sets = commands.add_parser("base-sets", help="false positives of base sets, from the cached per-base bitmaps")
+    sets.add_argument("sets", type=_int_list, nargs="+", help="comma separated base sets, e.g. 2,3 31,73")
+    for command in (rolling, base, liar, sets):
+        _add_common_options(command, suppress=True)
+    args = parser.parse_args(argv)
+
+    run_unit_tests()
+    if args.command == "base-sets":
+        base_sets(args.max_n, args.sets, args.workers)
+    if args.command in (None, "rolling-fp"):
+        rolling_fp(args.max_n, getattr(args, "window", ROLLING_WINDOW), args.bases or ROLLING_BASES, args.workers)
+    if args.command in (None, "base-impact"):
+        base_impact(args.max_n, args.bases or BASES_TO_TEST, args.workers)
+    if args.command in (None, "liars"):
+        liars(args.max_n, args.bases or BASES_TO_TEST, args.workers)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
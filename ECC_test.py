@@ -19,12 +19,13 @@ Doing "remainder" would be a stronger attack than parity bits. The adversary wan
 
 """
 
+import numpy as np
+
+import arith_backend
+
 def count_bits(n):
-  count = 0
-  while n:
-    n = n >> 1
-    count += 1
-  return count
+  """Number of bits needed to write n (0 for n = 0), in O(1) through the arithmetic backend."""
+  return arith_backend.BACKEND.bit_length(n)
 
 def count_set_bits(n):
   """Counts the number of set bits (1s) in an integer.
@@ -35,55 +36,71 @@ def count_set_bits(n):
   Returns:
     The number of set bits in n.
 
-  Author: this function written by chatGPT
+  Author: this function written by chatGPT, now using the arithmetic backend's popcount.
   """
-  count = 0
-  while n:
-    n &= (n - 1)
-    count += 1
-  return count
+  return arith_backend.BACKEND.popcount(n)
+
+def count_bits_batch(values):
+  """count_bits for every element of an integer array whose values are below 2^53 (exact as float64)."""
+  return np.frexp(np.asarray(values, dtype=np.float64))[1].astype(np.int64)
+
+
+class ParityCodec:
+    """
+    k-bit parity code: Alice appends (number of 1s in Y) mod 2^k to the prime she sends, Bob splits it back off.
+    The popcount of Y is passed in, so it is computed once per Y and not once per trial per codec.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self.mask = (1 << k) - 1
+
+    # For "Adversary-Alice" to use:
+
+    def encode(self, hash, set_bits) -> int:
+        return (hash << self.k) + (set_bits & self.mask)
+
+    def encode_batch(self, hashes, set_bits):
+        """encode for an int64 array of hashes (primes) sharing the same Y."""
+        return (np.asarray(hashes, dtype=np.int64) << self.k) + (set_bits & self.mask)
+
+    # For Bob to use:
+
+    def decode(self, parity_hash) -> (int, int):
+        return parity_hash >> self.k, parity_hash & self.mask
+
+    def decode_batch(self, parity_hashes):
+        parity_hashes = np.asarray(parity_hashes, dtype=np.int64)
+        return parity_hashes >> self.k, parity_hashes & self.mask
+
+
+ONE_BIT = ParityCodec(1)
+TWO_BIT = ParityCodec(2)
+FOUR_BIT = ParityCodec(4)
 
 
 # For "Adversary-Alice" to use:
 
 def build_one_bit_ECC(hash, y) -> int:
-    bits = count_set_bits(y)
-    parity = bits % 2
-
-    return hash * 2 + parity
+    return ONE_BIT.encode(hash, count_set_bits(y))
 
 def build_two_bit_ECC(hash, y) -> int:
-    bits = count_set_bits(y)
-    parity = bits % 4
-
-    return hash * 4 + parity
+    return TWO_BIT.encode(hash, count_set_bits(y))
 
 def build_four_bit_ECC(hash, y) -> int:
-    bits = count_set_bits(y)
-    parity = bits % 16
-
-    return hash * 16 + parity
+    return FOUR_BIT.encode(hash, count_set_bits(y))
 
 
 # For Bob to use:
 
 def decode_one_bit_ECC(parity_hash) -> (int, int):
-    parity = parity_hash  % 2 #extracting last bit
-    remaining_hash = parity_hash >> 1
-
-    return remaining_hash, parity
+    return ONE_BIT.decode(parity_hash)
 
 def decode_two_bit_ECC(parity_hash) -> (int, int):
-    parity = parity_hash  % 4 #extracting last bit2
-    remaining_hash = parity_hash >> 2
-
-    return remaining_hash, parity
+    return TWO_BIT.decode(parity_hash)
 
 def decode_four_bit_ECC(parity_hash) -> (int, int):
-    parity = parity_hash  % 16 #extracting last bit2
-    remaining_hash = parity_hash >> 4
-
-    return remaining_hash, parity
+    return FOUR_BIT.decode(parity_hash)
 
 
 # test:
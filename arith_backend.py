@@ -0,0 +1,102 @@
+#CS 5080
+#project 3 - big-integer arithmetic backends
+
+"""
+The big-integer operations of the project (modular exponentiation, reduction, products of many primes, popcount and
+bit length) go through one backend object, BACKEND. The pure Python backend is always available; when gmpy2 is
+installed its GMP-backed backend is picked up automatically, which makes multi-thousand-bit moduli and products
+much cheaper. Choose one explicitly with set_backend("python" / "gmpy2") or the PROJECT3_ARITH environment variable.
+"""
+
+import os
+
+
+def _tree_product(level):
+    # multiply neighbours pairwise, level by level, so both operands of each multiplication are about the same size
+    if not level:
+        return 1
+    while len(level) > 1:
+        paired = [level[i] * level[i + 1] for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            paired.append(level[-1])
+        level = paired
+    return level[0]
+
+
+class PythonBackend:
+    name = "python"
+
+    def modexp(self, base, exp, mod):
+        return pow(base, exp, mod)
+
+    def mod(self, a, m):
+        return a % m
+
+    def product(self, values):
+        return _tree_product([int(v) for v in values])
+
+    def popcount(self, n):
+        return _popcount(int(n))
+
+    def bit_length(self, n):
+        return int(n).bit_length()
+
+
+if hasattr(int, "bit_count"):
+    _popcount = int.bit_count
+else:  # Python < 3.10
+    def _popcount(n):
+        return bin(n).count("1")
+
+
+class Gmpy2Backend:
+    """
+    GMP through gmpy2. Products are returned as gmpy2.mpz (they are only ever reduced, multiplied or divided further,
+    which mpz does natively); modexp and mod return Python ints.
+    """
+    name = "gmpy2"
+
+    def __init__(self):
+        import gmpy2
+        self._gmpy2 = gmpy2
+
+    def modexp(self, base, exp, mod):
+        return int(self._gmpy2.powmod(base, exp, mod))
+
+    def mod(self, a, m):
+        return int(self._gmpy2.f_mod(a, m))
+
+    def product(self, values):
+        mpz = self._gmpy2.mpz
+        return _tree_product([mpz(int(v)) for v in values])
+
+    def popcount(self, n):
+        return self._gmpy2.popcount(n)
+
+    def bit_length(self, n):
+        return self._gmpy2.bit_length(n)
+
+
+BACKENDS = {"python": PythonBackend, "gmpy2": Gmpy2Backend}
+
+
+def set_backend(name):
+    """
+    Switch BACKEND to "python" or "gmpy2" (ImportError if gmpy2 is not installed).
+    """
+    global BACKEND
+    BACKEND = BACKENDS[name]()
+    return BACKEND
+
+
+def _default_backend():
+    name = os.environ.get("PROJECT3_ARITH")
+    if name:
+        return BACKENDS[name]()
+    try:
+        return Gmpy2Backend()
+    except ImportError:
+        return PythonBackend()
+
+
+BACKEND = _default_backend()
@@ -0,0 +1,248 @@
+#CS 5080
+#project 3 - benchmarks of the hot paths of both deliverables
+
+"""
+Times the sieve, Miller-Rabin (per call and per range sweep), the fingerprinting trials and the ECC_test codecs at
+several sizes, and reports ops/sec (plus peak memory for the ones where it matters). Results can be saved as a JSON
+baseline and compared against an earlier one, flagging anything that got slower than the threshold.
+
+    python benchmarks.py --save bench/baseline.json
+    python benchmarks.py --compare bench/baseline.json [--threshold 0.2]
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import ECC_test
+import prime_table
+import product_tree
+from primality import miller_rabin, miller_rabin_batch
+
+BENCHMARKS = []
+
+
+def benchmark(name, ops=1, memory=False, quick=True):
+    """
+    Register a benchmark. The decorated function does the setup and returns the callable to time; each call of it
+    counts as `ops` operations.
+    :param memory: also measure the peak memory of one call (tracemalloc, NumPy allocations included)
+    :param quick: part of the --quick subset
+    """
+    def register(setup):
+        BENCHMARKS.append({"name": name, "setup": setup, "ops": ops, "memory": memory, "quick": quick})
+        return setup
+    return register
+
+
+# sieve
+
+for _limit, _quick in [(10**5, True), (10**6, True), (10**7, False)]:
+    @benchmark(f"sieve[{_limit:.0e}]", ops=_limit, memory=True, quick=_quick)
+    def _sieve(limit=_limit):
+        return lambda: prime_table.sieve_odd_bits(limit)
+
+
+@benchmark("SegmentedSieve.odd_flags[window 2^20 at 1e10]", ops=1 << 20, memory=True)
+def _segmented_window():
+    sieve = prime_table.SegmentedSieve(10**10 + (1 << 20))
+    return lambda: sieve.odd_flags(10**10, 10**10 + (1 << 20))
+
+
+# Miller-Rabin
+
+@benchmark("miller_rabin[call, 7-digit n, bases 2,7,61]", ops=1000)
+def _miller_rabin_call():
+    ns = list(range(9_999_001, 10_000_001))
+    return lambda: [miller_rabin(n, bases=[2, 7, 61]) for n in ns]
+
+
+for _size, _quick in [(10**4, True), (10**5, True), (10**6, False)]:
+    @benchmark(f"miller_rabin[sweep {_size:.0e}]", ops=_size, memory=True, quick=_quick)
+    def _miller_rabin_sweep(size=_size):
+        return lambda: [miller_rabin(n, bases=[2, 7, 61]) for n in range(100, 100 + size)]
+
+    @benchmark(f"miller_rabin_batch[sweep {_size:.0e}]", ops=_size, memory=True, quick=_quick)
+    def _miller_rabin_batch_sweep(size=_size):
+        ns = np.arange(100, 100 + size, dtype=np.int64)
+        return lambda: miller_rabin_batch(ns, [2, 7, 61])
+
+
+@benchmark("SPRPCache.false_positives[bases 2,7,61 up to 1e7, cached]", ops=1, memory=True)
+def _sprp_cache_and():
+    import sprp_cache
+    cache = sprp_cache.SPRPCache(10**7)
+    cache.ensure([2, 7, 61])  # time the AND of the cached bitmaps, not the first scan
+    return lambda: cache.false_positives([2, 7, 61], 100, 10**7 + 1)
+
+
+# fingerprinting
+
+FINGERPRINT_TRIALS = 1000
+
+for _n, _quick in [(100, True), (500, True), (1000, False)]:
+    @benchmark(f"empirical_false_positive[n={_n}, per trial]", ops=FINGERPRINT_TRIALS, quick=_quick)
+    def _fingerprint_trials(n=_n):
+        import fingerprinting_setup
+        fingerprinting_setup.adversarial_product(n)  # time the trials, not the (cached) product
+        return lambda: fingerprinting_setup.empirical_false_positive(n, FINGERPRINT_TRIALS)
+
+    @benchmark(f"empirical_false_positive[n={_n}, per n]", ops=1, quick=_quick)
+    def _fingerprint_n(n=_n):
+        import fingerprinting_setup
+
+        fingerprinting_setup.adversarial_product(n)
+
+        def run():
+            for cache in fingerprinting_setup._adversarial_products.values():
+                cache.reset()  # include building the product
+            fingerprinting_setup.empirical_false_positive(n, 100)
+        return run
+
+
+@benchmark("multi_prime_false_positive[n=1000, r=4, per trial]", ops=FINGERPRINT_TRIALS)
+def _multi_prime_trials():
+    import fingerprinting_setup
+    fingerprinting_setup.adversarial_product(1000)
+    return lambda: fingerprinting_setup.multi_prime_false_positive(1000, (1, 2, 3, 4), FINGERPRINT_TRIALS)
+
+
+@benchmark("RemainderTree.remainders[primes in (1000, 10^6]]", ops=1)
+def _remainder_tree():
+    import fingerprinting_setup
+    tree = product_tree.RemainderTree(fingerprinting_setup._prime_table().primes_in(1000, 10**6 + 1))
+    y = fingerprinting_setup.adversarial_product(1000)
+    return lambda: tree.remainders(y)
+
+
+# ECC_test codecs
+
+_Y = (1 << 1000) - 12345  # ~1000 bit Y, like the adversary's at n = 1000
+
+
+@benchmark("ECC_test.count_bits[1000 bit]", ops=1000)
+def _count_bits():
+    return lambda: [ECC_test.count_bits(_Y) for _ in range(1000)]
+
+
+@benchmark("ECC_test.count_set_bits[1000 bit]", ops=1000)
+def _count_set_bits():
+    return lambda: [ECC_test.count_set_bits(_Y) for _ in range(1000)]
+
+
+@benchmark("ECC_test.build+decode_four_bit_ECC", ops=1000)
+def _build_decode():
+    return lambda: [ECC_test.decode_four_bit_ECC(ECC_test.build_four_bit_ECC(999983, _Y)) for _ in range(1000)]
+
+
+@benchmark("ECC_test.ParityCodec(4) batch[1e5 primes]", ops=10**5)
+def _codec_batch():
+    primes = prime_table.load(10**6).primes_in(0, 10**6 + 1)[:10**5]
+    set_bits = ECC_test.count_set_bits(_Y)
+    return lambda: ECC_test.FOUR_BIT.decode_batch(ECC_test.FOUR_BIT.encode_batch(primes, set_bits))
+
+
+def _time(fn, min_time):
+    """
+    Best time of one call, repeating the call for at least min_time seconds (and at least 3 times).
+    """
+    best = float("inf")
+    total = 0.0
+    runs = 0
+    while runs < 3 or total < min_time:
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        total += elapsed
+        runs += 1
+    return best, runs
+
+
+def _peak_memory(fn):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(quick=False, min_time=0.5, only=None):
+    """
+    :param only: optional substring; only benchmarks whose name contains it are run
+    :return: {"meta": ..., "results": {name: {"seconds", "ops_per_sec", "runs"[, "peak_bytes"]}}}
+    """
+    results = {}
+    for bench in BENCHMARKS:
+        if (quick and not bench["quick"]) or (only and only not in bench["name"]):
+            continue
+        fn = bench["setup"]()
+        seconds, runs = _time(fn, min_time)
+        result = {"seconds": seconds, "ops_per_sec": bench["ops"] / seconds, "runs": runs}
+        if bench["memory"]:
+            result["peak_bytes"] = _peak_memory(fn)
+        results[bench["name"]] = result
+        memory = f", peak {result['peak_bytes'] / 2**20:.1f} MiB" if "peak_bytes" in result else ""
+        print(f"{bench['name']:<50} {result['ops_per_sec']:>14,.0f} ops/s{memory}")
+    meta = {"python": sys.version.split()[0], "numpy": np.__version__, "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S")}
+    return {"meta": meta, "results": results}
+
+
+def compare(current, baseline, threshold=0.2):
+    """
+    Print the speed of every benchmark relative to the baseline.
+    :return: names of the benchmarks more than `threshold` slower (in ops/sec) than the baseline
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        ratio = result["ops_per_sec"] / baseline["results"][name]["ops_per_sec"]
+        flag = ""
+        if ratio < 1 - threshold:
+            flag = "  <-- REGRESSION"
+            regressions.append(name)
+        print(f"{name:<50} {ratio:>6.2f}x baseline{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save", help="write the results to this JSON file (a new baseline)")
+    parser.add_argument("--compare", help="baseline JSON file to compare the results with")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative slowdown in ops/sec reported as a regression (default 0.2)")
+    parser.add_argument("--quick", action="store_true", help="skip the largest sizes")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to repeat each benchmark for")
+    parser.add_argument("--only", help="only run benchmarks whose name contains this")
+    args = parser.parse_args(argv)
+
+    current = run(args.quick, args.min_time, args.only)
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(current, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print()
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+#CS 5080
+#project 3 - the fingerprinting protocol on real files and byte streams
+
+"""
+Alice/Bob fingerprint comparison of large payloads. Alice reads her file (memory-mapped) or stream (chunked) once,
+reduces its bytes, read as one big-endian integer Y of n bits, modulo a random prime p in (n, n^2] (from
+prime_sampler, no table) and sends the compact message (hash = Y mod p, p, optionally with ECC_test parity bits of Y
+appended to p, and the byte length).
+Bob checks his own copy X against the message in one streaming pass. Equal payloads always match; different ones
+match with probability about n / pi(n^2), as in fingerprinting_setup.
+
+The reduction is Horner's rule over blocks: r = (r * 256^len(block) + block) mod p, so only one block is ever turned
+into a Python int, never the whole multi-GB payload.
+
+    message = send("payload.bin")
+    verify("copy_of_payload.bin", message)  # True / False
+"""
+
+import collections
+import io
+import mmap
+import os
+import random
+
+import numpy as np
+
+import ECC_test
+import prime_sampler
+from prime_table import _POPCOUNT
+
+# bytes reduced per Horner step
+BLOCK = 1 << 16
+
+Fingerprint = collections.namedtuple("Fingerprint", ["hash", "p", "parity_bits", "size"])
+Fingerprint.__doc__ = """
+Alice's message: hash = Y mod p, p (with parity_bits bits of ECC_test parity of Y appended when parity_bits > 0)
+and the byte length of the payload (so payloads differing only in leading zero bytes do not match).
+"""
+
+
+def message_bits(message):
+    """
+    Number of bits Alice sends.
+    """
+    return ECC_test.count_bits(message.hash) + ECC_test.count_bits(message.p) + ECC_test.count_bits(message.size)
+
+
+def _blocks(source, block=BLOCK):
+    """
+    Yield the bytes of source (a path, a bytes-like object or a binary file object) as memoryview blocks. Files are
+    memory-mapped when possible and read in chunks otherwise; a block is only valid until the next one is requested.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            yield from _blocks(f, block)
+        return
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for i in range(0, len(view), block):
+            yield view[i:i + block]
+        return
+
+    try:
+        # only a file read from its start is mapped, a partly read one continues from where it is
+        mapped = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) if source.tell() == 0 else None
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        mapped = None  # pipes, sockets, in-memory streams and empty files
+    if mapped is None:
+        buffer = bytearray(block)
+        while True:
+            count = source.readinto(buffer)
+            if not count:
+                return
+            with memoryview(buffer)[:count] as view:
+                yield view
+        return
+    with mapped:
+        view = memoryview(mapped)
+        try:
+            for i in range(0, len(view), block):
+                with view[i:i + block] as piece:
+                    yield piece
+        finally:
+            view.release()
+
+
+def _size_of(source):
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return memoryview(source).nbytes
+    try:
+        return os.fstat(source.fileno()).st_size - source.tell()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        pass
+    if not source.seekable():
+        raise ValueError("the length of this stream is unknown, pass size=")
+    start = source.tell()
+    end = source.seek(0, io.SEEK_END)
+    source.seek(start)
+    return end - start
+
+
+def reduce_stream(source, p, block=BLOCK, count_set_bits=False):
+    """
+    One pass over source: Y mod p, the number of bytes, and (when count_set_bits) the number of 1 bits of Y.
+    :return: (Y mod p, size in bytes, set bits or None)
+    """
+    r = 0
+    size = 0
+    set_bits = 0 if count_set_bits else None
+    shift = pow(256, block, p)  # 256^len(block) mod p for every full block
+    for piece in _blocks(source, block):
+        length = len(piece)
+        step = shift if length == block else pow(256, length, p)
+        r = (r * step + int.from_bytes(piece, "big")) % p
+        size += length
+        if count_set_bits:
+            set_bits += int(_POPCOUNT[np.frombuffer(piece, dtype=np.uint8)].sum(dtype=np.int64))
+    return r, size, set_bits
+
+
+def send(source, parity_bits=0, size=None, rng=random):
+    """
+    Alice's side: fingerprint of source (path, bytes-like or binary file object).
+    :param parity_bits: 0, or k > 0 to append k bits of parity of Y to p (ECC_test.ParityCodec)
+    :param size: byte length of a stream whose length cannot be found with fstat (a pipe, say)
+    :return: Fingerprint
+    """
+    if size is None:
+        size = _size_of(source)
+    p = prime_sampler.random_prime(8 * size, rng)
+    hash, read, set_bits = reduce_stream(source, p, count_set_bits=parity_bits > 0)
+    if read != size:
+        raise ValueError(f"expected {size} bytes, read {read}")
+    sent_p = ECC_test.ParityCodec(parity_bits).encode(p, set_bits) if parity_bits else p
+    return Fingerprint(hash, sent_p, parity_bits, size)
+
+
+def verify(source, message):
+    """
+    Bob's side: True if source matches Alice's message (always when the payloads are equal), in one streaming pass.
+    """
+    p, parity = message.p, None
+    if message.parity_bits:
+        p, parity = ECC_test.ParityCodec(message.parity_bits).decode(message.p)
+    hash, size, set_bits = reduce_stream(source, p, count_set_bits=parity is not None)
+    if size != message.size or hash != message.hash:
+        return False
+    return parity is None or (set_bits & ((1 << message.parity_bits) - 1)) == parity
@@ -1,11 +1,19 @@
+import bisect
+import functools
 import math
 import random
-import bisect
-import matplotlib.pyplot as plt
+import numpy as np
 
+import arith_backend
 import ECC_test
-
-import progressbar
+import instrumentation
+import prime_table
+import plots
+import prime_sampler
+import product_tree
+import result_store
+import sequential
+import sweep
 
 #CS 5080
 #4/27/2025
@@ -13,89 +21,228 @@ import progressbar
 
 #project 3 - part of deliverable 1 code
 
-def sieve(n):
+# Primes up to (1,000)^2 for the first part of the assignment: the exact mode and the remainder trees use the whole
+# range (n, n^2], so they need the table; larger n draw Alice's primes from prime_sampler instead.
+MAX_N = 1000
+
+
+@functools.lru_cache(maxsize=None)
+def _prime_table():
+    # loaded on first use (memory-mapped from the cache after the first run), so importing this module is cheap
+    return prime_table.load(MAX_N**2)
+
+
+class AdversarialProduct:
     """
-    Generate list of primes up to n using the Sieve of Eratosthenes.
+    The adversary's Y for every n: the product of the longest prefix of the primes in [n, n^2] whose product is below
+    2**(n - slack_bits) (slack_bits=1 is the remainder experiment's Y, which is doubled afterwards).
+
+    As n grows, the prefix loses at most its first prime and the bound doubles, so the product is updated from the
+    previous n by dividing out / multiplying in only the primes that change, with a product tree for long runs of them.
+    Results are memoised, so the second experiment of a sweep gets its products for free.
     """
-    sieve = [True] * (n + 1)
-    sieve[0:2] = [False, False]
-    for i in range(2, int(n**0.5) + 1):
-        if sieve[i]:
-            for j in range(i * i, n + 1, i):
-                sieve[j] = False
-    return [i for i, is_prime in enumerate(sieve) if is_prime]
 
+    def __init__(self, primes, slack_bits=0):
+        self.primes = [int(p) for p in primes]
+        self.slack_bits = slack_bits
+        # _log_prefix[i] = log2 of the product of primes[:i], used to estimate how far the prefix reaches
+        self._log_prefix = np.concatenate([[0.0], np.cumsum(np.log2(np.asarray(self.primes, dtype=np.float64)))])
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the cached prefix and every memoised product.
+        """
+        self.lo = 0  # the cached prefix is primes[lo:hi]
+        self.hi = 0
+        self.value = 1
+        self._memo = {}
+
+    def product(self, n):
+        if n in self._memo:
+            return self._memo[n]
+        lo = bisect.bisect_left(self.primes, n)
+        end = bisect.bisect_right(self.primes, n * n)
+        bits = n - self.slack_bits
+        bound = 1 << max(bits, 0)
+
+        # move the start of the prefix; a start before the cached one (a new sweep) starts over
+        if self.lo <= lo <= self.hi:
+            self.value //= product_tree.product(self.primes[self.lo:lo])
+        else:
+            self.value, self.hi = 1, lo
+        self.lo = lo
+
+        # jump close to the new end using the log2 estimate, then settle it exactly
+        target = int(np.searchsorted(self._log_prefix, self._log_prefix[lo] + bits, side="left")) - 1
+        target = min(max(target, lo), end)
+        if target > self.hi:
+            self.value *= product_tree.product(self.primes[self.hi:target])
+        elif target < self.hi:
+            self.value //= product_tree.product(self.primes[target:self.hi])
+        self.hi = target
+        while self.hi > lo and self.value >= bound:
+            self.hi -= 1
+            self.value //= self.primes[self.hi]
+        while self.hi < end and self.value * self.primes[self.hi] < bound:
+            self.value *= self.primes[self.hi]
+            self.hi += 1
 
-# Precompute primes up to (1,000)^2 for the first part of the assignment
-MAX_N = 1000
-_primes = sieve(MAX_N**2)
+        self._memo[n] = self.value
+        return self.value
 
 
-def empirical_false_positive(n, trials=10000):
+_adversarial_products = {}
+
+
+def adversarial_product(n, slack_bits=0):
     """
-    Empirically estimate the false positive rate by simulating the fingerprint test
-    with x = 0 and y = K (constructed adversarially) for a number of trials.
+    Product of the primes in [n, n^2], taken in order while the product stays below 2**(n - slack_bits).
+    Shared by both experiments and cached across the n sweep (see AdversarialProduct).
     """
-    # primes in (n, n^2]
-    lo = bisect.bisect_right(_primes, n - 1)
-    hi = bisect.bisect_right(_primes, n * n)
-    primes_range = _primes[lo:hi]
+    if n > MAX_N:
+        return _large_adversarial_product(n, slack_bits)
+    if slack_bits not in _adversarial_products:
+        _adversarial_products[slack_bits] = AdversarialProduct(_prime_table().primes_in(0, MAX_N**2 + 1), slack_bits)
+    return _adversarial_products[slack_bits].product(n)
 
-    # build adversarial K factors (same as theoretical selection)
-    mult_total = 1
-    for p in primes_range:
-        if mult_total * p < 2**n:
-            mult_total = mult_total * p
-        else:
-            break
 
-    # mult total is Alice's "Y" that the adversary gives her to then send, but Alice still has control of "p" and parity
-    y = mult_total
-    fp_count_no_parity = 0
-    fp_count_1_parity = 0
-    fp_count_2_parity = 0
-    fp_count_4_parity = 0
+@functools.lru_cache(maxsize=8)
+def _large_adversarial_product(n, slack_bits):
+    # beyond the table, sieve a window of primes from n on, widened until their product reaches 2**(n - slack_bits)
+    sieve = prime_table.SegmentedSieve(n * n)
+    span = n
+    while True:
+        primes = sieve.primes_in(n, min(n + span, n * n) + 1)
+        if np.log2(primes.astype(np.float64)).sum() > n - slack_bits + 1 or n + span >= n * n:
+            return AdversarialProduct(primes, slack_bits).product(n)
+        span *= 2
+
+
+# the 1, 2 and 4 bit parity codes Alice can append to her prime
+PARITY_CODECS = [ECC_test.ONE_BIT, ECC_test.TWO_BIT, ECC_test.FOUR_BIT]
 
-    no_parity_size, parity_1_size, parity_2_size, parity_4_size = 0, 0, 0, 0
 
-    for _ in range(trials):
-        p = random.choice(primes_range)
-        hash = y % p
-        p_1 = ECC_test.build_one_bit_ECC(p, y)
-        p_2 = ECC_test.build_two_bit_ECC(p, y)
-        p_4 = ECC_test.build_four_bit_ECC(p, y)
+def _chosen_indices(count, trials, exact, rng=random):
+    """
+    Indices into the prime range (of `count` primes) of the primes Alice picks: every prime of the range once when
+    exact (p is uniform over the range, so averaging over all of them gives the exact expectation), otherwise `trials`
+    random picks (the same draws as rng.choice on the range itself).
+    :return: (int64 array of indices, number of picks)
+    """
+    if exact:
+        return np.arange(count, dtype=np.int64), count
+    indices = range(count)
+    return np.array([rng.choice(indices) for _ in range(trials)], dtype=np.int64), trials
 
-        # Bob is then given (by the adversary) X = 0. Bob knows the parity (pre communicated) and tries to decode and check.
-        if hash == 0:
-            fp_count_no_parity += 1
 
-        p_from_1, parity_1 = ECC_test.decode_one_bit_ECC(p_1)
-        if hash == 0 and parity_1 == 0:
-            fp_count_1_parity += 1
+@functools.lru_cache(maxsize=4)
+def _range_tree(n):
+    # both experiments evaluate the same ranges; a handful of trees is enough for a sweep going up n
+    return product_tree.RemainderTree(_prime_table().primes_in(n, n * n + 1))
 
-        p_from_2, parity_2 = ECC_test.decode_two_bit_ECC(p_2)
-        if hash == 0 and parity_2 == 0:
-            fp_count_2_parity += 1
 
-        p_from_4, parity_4 = ECC_test.decode_four_bit_ECC(p_4)
-        if hash == 0 and parity_4 == 0:
-            fp_count_4_parity += 1
+def _residues(ys, n, primes_range, indices):
+    """
+    [y mod p for p = primes_range[indices]] for each y of ys, as int64 arrays. When there are at least as many picks
+    as primes in the range, every prime of the range is reduced at once through the range's remainder tree (about
+    the cost of one direct reduction per prime); fewer picks are reduced one by one.
+    """
+    if len(indices) >= len(primes_range):
+        return [residues[indices] for residues in _range_tree(n).remainders_many(ys)]
+    mod = arith_backend.BACKEND.mod
+    chosen = primes_range[indices].tolist()
+    return [np.array([mod(y, p) for p in chosen], dtype=np.int64) for y in ys]
 
-        if (p != p_from_1) or (p != p_from_2) or (p != p_from_4):
+
+def _trials(ys, n, trials, exact, rng=random):
+    """
+    Alice's primes for the trials of n, and each y of ys reduced by them. Up to MAX_N the primes are picked from the
+    table's range (n, n^2] (see _chosen_indices); above it `trials` primes are sampled without a table.
+    :return: (int64 array of the primes, [int64 array of y mod p for each y], number of trials)
+    """
+    if n <= MAX_N:
+        primes_range = _prime_table().primes_in(n, n * n + 1)
+        indices, trials = _chosen_indices(len(primes_range), trials, exact, rng)
+        return primes_range[indices], _residues(ys, n, primes_range, indices), trials
+    if exact:
+        raise ValueError(f"exact=True needs every prime of (n, n^2], which is only tabulated up to n = {MAX_N}")
+    primes = prime_sampler.random_primes(n, trials, rng)
+    mod = arith_backend.BACKEND.mod
+    chosen = primes.tolist()
+    return primes, [np.array([mod(y, p) for p in chosen], dtype=np.int64) for y in ys], trials
+
+
+def _random_primes(n, count, rng=random):
+    """
+    `count` independently drawn uniform primes of (n, n^2]: from the table up to MAX_N, from prime_sampler above it.
+    """
+    if n <= MAX_N:
+        primes_range = _prime_table().primes_in(n, n * n + 1)
+        indices, _ = _chosen_indices(len(primes_range), count, False, rng)
+        return primes_range[indices]
+    return prime_sampler.random_primes(n, count, rng)
+
+
+def _parity_trials(y, p, hash):
+    """
+    The trials of empirical_false_positive for Alice's primes p (an int64 array, one per trial), all at once.
+    :param hash: y mod p for each of them
+    :return: ([false positives with no / 1 / 2 / 4 bit parity], [total bits sent with no / 1 / 2 / 4 bit parity])
+    """
+    y_set_bits = ECC_test.count_set_bits(y)  # computed once per Y, shared by every trial and codec
+
+    # Bob is then given (by the adversary) X = 0. Bob knows the parity (pre communicated) and tries to decode and check.
+    hash_is_zero = hash == 0
+    # summing sizes of bits: sending "0" result is 1 bit
+    hash_chosen_size = np.where(hash_is_zero, 1, ECC_test.count_bits_batch(hash))
+
+    fp_counts = [int(hash_is_zero.sum())]
+    sizes = [int((ECC_test.count_bits_batch(p) + hash_chosen_size).sum())]
+    for codec in PARITY_CODECS:
+        p_k = codec.encode_batch(p, y_set_bits)
+        p_from_k, parity_k = codec.decode_batch(p_k)
+        if (p_from_k != p).any():
             exit("Primes decoded do not match what was sent!")
+        fp_counts.append(int((hash_is_zero & (parity_k == 0)).sum()))
+        sizes.append(int((ECC_test.count_bits_batch(p_k) + hash_chosen_size).sum()))
+    return fp_counts, sizes
 
-        # summing sizes of bits:
-        hash_chosen_size = ECC_test.count_bits(hash)
-        if hash == 0:
-            no_parity_size += 1 + ECC_test.count_bits(p) # sending "0" result is 1 bit
-            parity_1_size += 1 + ECC_test.count_bits(p_1)
-            parity_2_size += 1 + ECC_test.count_bits(p_2)
-            parity_4_size += 1 + ECC_test.count_bits(p_4)
-        else:
-            no_parity_size += ECC_test.count_bits(p) + hash_chosen_size
-            parity_1_size += ECC_test.count_bits(p_1) + hash_chosen_size
-            parity_2_size += ECC_test.count_bits(p_2) + hash_chosen_size
-            parity_4_size += ECC_test.count_bits(p_4) + hash_chosen_size
+
+def _remainder_trials(hash_normal, hash_remainder, y_remainder):
+    """
+    The trials of empirical_false_positive_remainder_experiment, all at once.
+    :param hash_normal, hash_remainder: both Y mod each of Alice's primes
+    :return: [false positives of regular fingerprinting, false positives with the 1-bit remainder]
+    """
+    # Bob is then given (by the adversary) X = 0. Bob knows the parity (pre communicated) and tries to decode and check.
+    fp_count_no_remainder = int((hash_normal == 0).sum())
+
+    remainder = y_remainder % 2
+    fp_count_1_remainder = int((hash_remainder == 0).sum()) if remainder == 0 else 0
+    return [fp_count_no_remainder, fp_count_1_remainder]
+
+
+def empirical_false_positive(n, trials=10000, exact=False, rng=random):
+    """
+    Empirically estimate the false positive rate by simulating the fingerprint test
+    with x = 0 and y = K (constructed adversarially) for a number of trials.
+    With exact=True every prime of the range is used once instead, which gives the exact rates and average sizes.
+    rng is the random source of the trials (the global random module unless a sweep gives n its own stream).
+    """
+    # build adversarial K factors (same as theoretical selection)
+    with instrumentation.stage("fingerprint.products"):
+        mult_total = adversarial_product(n)
+
+    # mult total is Alice's "Y" that the adversary gives her to then send, but Alice still has control of "p" and parity
+    y = mult_total
+    with instrumentation.stage("fingerprint.trials"):
+        # Alice's primes in (n, n^2]
+        p, [hash], trials = _trials([y], n, trials, exact, rng)
+        fp_counts, sizes = _parity_trials(y, p, hash)
+    instrumentation.count("fingerprint.trials", trials)
+    fp_count_no_parity, fp_count_1_parity, fp_count_2_parity, fp_count_4_parity = fp_counts
+    no_parity_size, parity_1_size, parity_2_size, parity_4_size = sizes
 
     # After trials are over:
     if trials == 0:
@@ -116,50 +263,27 @@ def empirical_false_positive(n, trials=10000):
 
 
 
-def empirical_false_positive_remainder_experiment(n, trials=10000):
+def empirical_false_positive_remainder_experiment(n, trials=10000, exact=False, rng=random):
     """
     Empirically estimate the false positive rate by simulating the fingerprint test
     with x = 0 and y = K (constructed adversarially) for a number of trials.
+    With exact=True every prime of the range is used once instead, which gives the exact rates.
+    rng is the random source of the trials (the global random module unless a sweep gives n its own stream).
     """
-    # primes in (n, n^2]
-    lo = bisect.bisect_right(_primes, n - 1)
-    hi = bisect.bisect_right(_primes, n * n)
-    primes_range = _primes[lo:hi]
-
-    # build adversarial K factors (same as theoretical selection)
-    mult_total = 1
-    mult_total_remainder = 1
-    for p in primes_range:
-        if mult_total_remainder * p * 2 < 2**n:
-            mult_total_remainder = mult_total_remainder * p
-        else:
-            break
-
-    for p in primes_range:
-        if mult_total * p < 2**n:
-            mult_total = mult_total * p
-        else:
-            break
+    # build adversarial K factors (same as theoretical selection); the remainder adversary leaves a factor 2 of room
+    with instrumentation.stage("remainder.products"):
+        mult_total = adversarial_product(n)
+        mult_total_remainder = adversarial_product(n, slack_bits=1)
 
     # mult total is Alice's "Y" that the adversary gives her to then send, but Alice still has control of "p" and parity
     y_remainder = mult_total_remainder * 2 # Adversary does this is so that the remainder to X and Y is even for both
     y_reg = mult_total
-    fp_count_no_remainder = 0
-    fp_count_1_remainder = 0
-
-    for _ in range(trials):
-        p = random.choice(primes_range)
-        hash_remainder = y_remainder % p
-        hash_normal = y_reg % p
-        p_1 = p * 2 + y_remainder % 2
-
-        # Bob is then given (by the adversary) X = 0. Bob knows the parity (pre communicated) and tries to decode and check.
-        if hash_normal == 0:
-            fp_count_no_remainder += 1
 
-        remainder = y_remainder % 2
-        if hash_remainder == 0 and remainder == 0:
-            fp_count_1_remainder += 1
+    with instrumentation.stage("remainder.trials"):
+        # Alice's primes in (n, n^2], both Y against the same primes (and the same remainder tree)
+        _, (hash_normal, hash_remainder), trials = _trials([y_reg, y_remainder], n, trials, exact, rng)
+        fp_count_no_remainder, fp_count_1_remainder = _remainder_trials(hash_normal, hash_remainder, y_remainder)
+    instrumentation.count("remainder.trials", trials)
 
     # After trials are over:
     if trials == 0:
@@ -171,74 +295,193 @@ def empirical_false_positive_remainder_experiment(n, trials=10000):
         return no_remainder_rate, remainder_1_rate
 
 
-def run_fingerprint_experiments(n_min=6, n_max=1000, trials=100):
+def adaptive_false_positive(n, max_trials=10000, halfwidth=0.005, rng=random):
+    """
+    empirical_false_positive with as many trials as needed: batches of trials are run until the 95% Wilson interval
+    of each of the four false positive rates is within +-halfwidth, or max_trials have been run (see sequential.py).
+    :return: the values of empirical_false_positive, the number of trials used, then (lo, hi) of each of the 4 rates
+    """
+    with instrumentation.stage("fingerprint.products"):
+        y = adversarial_product(n)
+
+    def run_batch(size):
+        p, [hash], _ = _trials([y], n, size, False, rng)
+        return _parity_trials(y, p, hash)
+
+    with instrumentation.stage("fingerprint.trials"):
+        fp_counts, sizes, trials, intervals = sequential.sample_until(run_batch, max_trials, halfwidth)
+    instrumentation.count("fingerprint.trials", trials)
+    if trials == 0:
+        return (0.0,) * 8 + (ECC_test.count_bits(y), 0) + (0.0, 1.0) * 4
+    rates = [count / trials for count in fp_counts]
+    avg_sizes = [size / trials for size in sizes]
+    return (*rates, *avg_sizes, ECC_test.count_bits(y), trials, *(bound for interval in intervals for bound in interval))
+
+
+def adaptive_remainder_experiment(n, max_trials=10000, halfwidth=0.005, rng=random):
+    """
+    empirical_false_positive_remainder_experiment with as many trials as needed, like adaptive_false_positive.
+    :return: the two rates, the number of trials used, then (lo, hi) of each rate
+    """
+    with instrumentation.stage("remainder.products"):
+        y_reg = adversarial_product(n)
+        y_remainder = adversarial_product(n, slack_bits=1) * 2
+
+    def run_batch(size):
+        _, hashes, _ = _trials([y_reg, y_remainder], n, size, False, rng)
+        return _remainder_trials(*hashes, y_remainder), []
+
+    with instrumentation.stage("remainder.trials"):
+        fp_counts, _, trials, intervals = sequential.sample_until(run_batch, max_trials, halfwidth)
+    instrumentation.count("remainder.trials", trials)
+    if trials == 0:
+        return 0.0, 0.0, 0, 0.0, 1.0, 0.0, 1.0
+    return (*(count / trials for count in fp_counts), trials,
+            *(bound for interval in intervals for bound in interval))
+
+
+def _multi_prime_trials(y, primes, rs):
+    """
+    The trials of multi_prime_false_positive, all at once. Row t of `primes` holds the primes of trial t; Alice with r
+    primes uses the first r of them. Each trial reduces y once, modulo the product of its primes, and only that short
+    remainder modulo each prime, instead of dividing the ~n bit y once per prime.
+    :return: ([false positives with r primes for r in rs], [total bits sent with r primes for r in rs])
+    """
+    mod = arith_backend.BACKEND.mod
+    rows = primes.tolist()
+    hashes = np.array([[rest % p for p in row] for row, rest in zip(rows, (mod(y, math.prod(row)) for row in rows))],
+                      dtype=np.int64).reshape(primes.shape)
+
+    # Bob is given X = 0, so a trial with r primes is a false positive when all of its first r hashes are 0
+    hash_is_zero = hashes == 0
+    all_zero = np.logical_and.accumulate(hash_is_zero, axis=1)
+    # each prime and its hash are sent, a "0" hash is 1 bit (as in _parity_trials)
+    bits = ECC_test.count_bits_batch(primes) + np.where(hash_is_zero, 1, ECC_test.count_bits_batch(hashes))
+    total_bits = np.cumsum(bits, axis=1)
+    return [int(all_zero[:, r - 1].sum()) for r in rs], [int(total_bits[:, r - 1].sum()) for r in rs]
+
+
+def multi_prime_false_positive(n, rs=(1, 2, 3, 4), trials=10000, rng=random):
+    """
+    Empirically estimate the false positive rate when Alice sends the hashes of Y for r independently chosen primes
+    of (n, n^2] (and the primes), for each r in rs, with x = 0 and y = K (constructed adversarially). Bob only accepts
+    when all r hashes match. The trials of the different r share their primes: r uses the first r of max(rs) draws.
+    rng is the random source of the trials (the global random module unless a sweep gives n its own stream).
+    :return: the false positive rate for each r, the average number of bits sent for each r, then the size of Y
+    """
+    with instrumentation.stage("multi_prime.products"):
+        y = adversarial_product(n)
+
+    with instrumentation.stage("multi_prime.trials"):
+        primes = _random_primes(n, trials * max(rs), rng).reshape(trials, max(rs))
+        fp_counts, sizes = _multi_prime_trials(y, primes, rs)
+    instrumentation.count("multi_prime.trials", trials)
+    if trials == 0:
+        return (0.0,) * (2 * len(rs)) + (ECC_test.count_bits(y),)
+    return (*(count / trials for count in fp_counts), *(size / trials for size in sizes), ECC_test.count_bits(y))
+
+
+def _interval_columns(rate_columns):
+    return [f"{column}_{bound}" for column in rate_columns for bound in ("lo", "hi")]
+
+
+FINGERPRINT_COLUMNS = ["no_parity_rate", "parity_1_rate", "parity_2_rate", "parity_4_rate",
+                       "avg_no_parity_size", "avg_parity_1_size", "avg_parity_2_size", "avg_parity_4_size",
+                       "data_size"]
+REMAINDER_COLUMNS = ["no_remainder_rate", "remainder_1_rate"]
+# the adaptive sweeps also report the trials each n used and the Wilson interval of each rate
+ADAPTIVE_FINGERPRINT_COLUMNS = FINGERPRINT_COLUMNS + ["trials"] + _interval_columns(FINGERPRINT_COLUMNS[:4])
+ADAPTIVE_REMAINDER_COLUMNS = REMAINDER_COLUMNS + ["trials"] + _interval_columns(REMAINDER_COLUMNS)
+# numbers of primes r the multi-prime sweep tries by default
+MULTI_PRIME_RS = (1, 2, 3, 4)
+
+
+def multi_prime_columns(rs):
+    """
+    The columns of the multi-prime sweep for the numbers of primes rs, in the order multi_prime_false_positive returns.
+    """
+    return [f"primes_{r}_rate" for r in rs] + [f"avg_primes_{r}_size" for r in rs] + ["data_size"]
+
+
+def _sweep_params(n_min, n_max, trials, exact, seed, halfwidth, n_step):
+    params = {"n_min": n_min, "n_max": n_max, "trials": trials, "exact": exact, "seed": seed}
+    if halfwidth is not None:
+        params["halfwidth"] = halfwidth  # only set for adaptive runs, so fixed runs keep their stored results
+    if n_step != 1:
+        params["n_step"] = n_step
+    return params
+
+
+def compute_fingerprint_experiments(n_min=6, n_max=1000, trials=100, exact=False, seed=None, workers=1, store=None,
+                                    halfwidth=None, n_step=1):
+    """
+    The sweep of run_fingerprint_experiments without the plotting. With a result_store.ResultStore the results are
+    saved as they are computed and an interrupted sweep with the same parameters resumes where it stopped.
+    With a halfwidth, trials is the maximum budget of adaptive_false_positive instead of a fixed count.
+    n_step runs every n_step-th n only, for sweeps past MAX_N (e.g. n_min=10**4, n_max=10**6, n_step=10**4).
+    :return: {"n": ..., column: per-n values} for the FINGERPRINT_COLUMNS (ADAPTIVE_FINGERPRINT_COLUMNS if adaptive)
+    """
+    ns = list(range(n_min, n_max + 1, n_step))
+    params = _sweep_params(n_min, n_max, trials, exact, seed, halfwidth, n_step)
+    if halfwidth is None:
+        fn, args, columns = empirical_false_positive, (trials, exact), FINGERPRINT_COLUMNS
+    else:
+        fn, args, columns = adaptive_false_positive, (trials, halfwidth), ADAPTIVE_FINGERPRINT_COLUMNS
+    bar = instrumentation.progress_bar(len(ns))
+    with instrumentation.stage("fingerprint.sweep"):
+        return sweep.run_stored_sweep(store, "fingerprint", params, columns, fn, ns, args, seed=seed, workers=workers,
+                                      progress=bar.update)
+
+
+def run_fingerprint_experiments(n_min=6, n_max=1000, trials=100, exact=False, seed=None, workers=1, store=None,
+                                halfwidth=None, n_step=1):
     """
     Run both theoretical and empirical experiments for n in [n_min..n_max]
     and plot the results on the same matplotlib figure.
+    With exact=True the rates and sizes are computed over every prime of each range instead of `trials` samples.
+    With a halfwidth (e.g. 0.005) each n runs trials until its rates are known to +-halfwidth, up to `trials`.
+    Above MAX_N the primes are sampled without a table (prime_sampler), so only random trials are possible there.
+    Each n draws its trials from its own stream seeded from `seed`, so the results do not depend on `workers`.
+    With a result_store.ResultStore as `store` the results are saved, and reused or resumed on the next run.
     """
-    ns = list(range(n_min, n_max + 1))
-    no_parity_rate_array = []
-    parity_1_rate_array = []
-    parity_2_rate_array = []
-    parity_4_rate_array = []
-
-    avg_no_parity_size_array = []
-    avg_parity_1_size_array = []
-    avg_parity_2_size_array = []
-    avg_parity_4_size_array = []
-
-    data_size_array = []
-
-    bar = progressbar.ProgressBar(max_value=len(ns))
-
-    for ix, n in enumerate(ns):
-        no_parity_rate, parity_1_rate, parity_2_rate, parity_4_rate, avg_no_parity_size, avg_parity_1_size, avg_parity_2_size, avg_parity_4_size, data_size = empirical_false_positive(n, trials)
-        no_parity_rate_array.append(no_parity_rate)
-        parity_1_rate_array.append(parity_1_rate)
-        parity_2_rate_array.append(parity_2_rate)
-        parity_4_rate_array.append(parity_4_rate)
-
-        avg_no_parity_size_array.append(avg_no_parity_size)
-        avg_parity_1_size_array.append(avg_parity_1_size)
-        avg_parity_2_size_array.append(avg_parity_2_size)
-        avg_parity_4_size_array.append(avg_parity_4_size)
-
-        data_size_array.append(data_size)
-
-        bar.update(ix + 1)
-
-    plt.figure()
-    plt.plot(ns, no_parity_rate_array, label=f'No parity, ({trials} trials)', linewidth=1)
-    plt.plot(ns, parity_1_rate_array, label=f'1-bit parity, ({trials} trials)', linewidth=1)
-    plt.plot(ns, parity_2_rate_array, label=f'2-bit parity, ({trials} trials)', linewidth=1)
-    plt.plot(ns, parity_4_rate_array, label=f'4-bit parity, ({trials} trials)', linewidth=1)
-    plt.xlabel('n')
-    plt.ylabel('Experimental False positive rate')
-    plt.title('Fingerprinting: False Positive Rate, X/Y Parity Checked')
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.show()
-
-    plt.figure()
-    plt.plot(data_size_array, avg_no_parity_size_array, label=f'No parity, ({trials} trials)')
-    plt.plot(data_size_array, avg_parity_1_size_array, label=f'1-bit parity, ({trials} trials)')
-    plt.plot(data_size_array, avg_parity_2_size_array, label=f'2-bit parity, ({trials} trials)')
-    plt.plot(data_size_array, avg_parity_4_size_array, label=f'4-bit parity, ({trials} trials)')
-    plt.xlabel('data size of Y (bits)')
-    plt.ylabel('Experimental Tranmission Size (bits)')
-    plt.title('Fingerprinting: Transmission Size With Parity')
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.show()
-    print(data_size_array)
+    results = compute_fingerprint_experiments(n_min, n_max, trials, exact, seed, workers, store, halfwidth, n_step)
+    label = plots.sample_label(trials, exact, halfwidth)
+
+    with instrumentation.stage("plotting"):
+        plots.parity_false_positive_rates(results, label)
+    plots.show("fingerprint_rates")
+
+    with instrumentation.stage("plotting"):
+        plots.parity_transmission_sizes(results, label)
+    plots.show("fingerprint_sizes")
+    print(results["data_size"].tolist())
     print()
-    print(avg_no_parity_size_array)
-    print(avg_parity_2_size_array)
-    print(avg_parity_4_size_array)
+    print(results["avg_no_parity_size"].tolist())
+    print(results["avg_parity_2_size"].tolist())
+    print(results["avg_parity_4_size"].tolist())
 
-def run_remainder_experiment(n_min=6, n_max=1000, trials=10000):
+
+def compute_remainder_experiment(n_min=6, n_max=1000, trials=10000, exact=False, seed=None, workers=1, store=None,
+                                 halfwidth=None, n_step=1):
+    """
+    The sweep of run_remainder_experiment without the plotting, stored, resumable and optionally adaptive like
+    compute_fingerprint_experiments.
+    :return: {"n": ..., column: per-n values} for the REMAINDER_COLUMNS (ADAPTIVE_REMAINDER_COLUMNS if adaptive)
+    """
+    ns = list(range(n_min, n_max + 1, n_step))
+    params = _sweep_params(n_min, n_max, trials, exact, seed, halfwidth, n_step)
+    if halfwidth is None:
+        fn, args, columns = empirical_false_positive_remainder_experiment, (trials, exact), REMAINDER_COLUMNS
+    else:
+        fn, args, columns = adaptive_remainder_experiment, (trials, halfwidth), ADAPTIVE_REMAINDER_COLUMNS
+    bar = instrumentation.progress_bar(len(ns))
+    with instrumentation.stage("remainder.sweep"):
+        return sweep.run_stored_sweep(store, "remainder", params, columns, fn, ns, args, seed=seed, workers=workers,
+                                      progress=bar.update)
+
+
+def run_remainder_experiment(n_min=6, n_max=1000, trials=10000, exact=False, seed=None, workers=1, store=None,
+                             halfwidth=None, n_step=1):
     """
     This experiment shows what happens if Alice sent 1 extra bit with each "p" as the remainder of her "Y" value.
     The advesary ensures that Y and X both have a remainder of "0" by doubling the size of "Y". However, the adversary
@@ -246,38 +489,61 @@ def run_remainder_experiment(n_min=6, n_max=1000, trials=10000):
     :param n_min: smallest n value to run
     :param n_max: max n value to end at
     :param trials: for each n, average accross how many trials.
+    :param exact: use every prime of the range once instead of random trials, which gives the exact rates
+    :param seed: seed of the per-n random streams (None picks one from the global random module)
+    :param workers: number of processes the n values are spread over; the results do not depend on it
+    :param store: optional result_store.ResultStore to save (and resume) the results in
+    :param halfwidth: run each n adaptively until its rates are known to +-halfwidth (trials is then the maximum)
+    :param n_step: run every n_step-th n only (for sweeps past MAX_N, where primes are sampled without a table)
     :return: None
     """
+    results = compute_remainder_experiment(n_min, n_max, trials, exact, seed, workers, store, halfwidth, n_step)
 
+    with instrumentation.stage("plotting"):
+        plots.remainder_false_positive_rates(results, plots.sample_label(trials, exact, halfwidth))
+    plots.show("remainder")
 
-    ns = list(range(n_min, n_max + 1))
-    no_remainder_rate_array = []
-    remainder_1_rate_array = []
-
-    bar = progressbar.ProgressBar(max_value=len(ns))
 
-    for ix, n in enumerate(ns):
-        no_remainder_rate, remainder_1_rate = empirical_false_positive_remainder_experiment(
-            n, trials)
-        no_remainder_rate_array.append(no_remainder_rate)
-        remainder_1_rate_array.append(remainder_1_rate)
-
-        bar.update(ix + 1)
+def compute_multi_prime_experiment(n_min=6, n_max=1000, rs=MULTI_PRIME_RS, trials=10000, seed=None, workers=1,
+                                   store=None, n_step=1):
+    """
+    The sweep of run_multi_prime_experiment without the plotting, over n and the numbers of primes rs. Stored and
+    resumable like compute_fingerprint_experiments.
+    :return: {"n": ..., column: per-n values} for the multi_prime_columns(rs)
+    """
+    rs = list(rs)
+    ns = list(range(n_min, n_max + 1, n_step))
+    params = _sweep_params(n_min, n_max, trials, False, seed, None, n_step)
+    params["rs"] = rs
+    bar = instrumentation.progress_bar(len(ns))
+    with instrumentation.stage("multi_prime.sweep"):
+        return sweep.run_stored_sweep(store, "multi_prime", params, multi_prime_columns(rs), multi_prime_false_positive,
+                                      ns, (tuple(rs), trials), seed=seed, workers=workers, progress=bar.update)
+
+
+def run_multi_prime_experiment(n_min=6, n_max=1000, rs=MULTI_PRIME_RS, trials=10000, seed=None, workers=1,
+                               store=None, n_step=1):
+    """
+    Instead of parity bits or a remainder bit, Alice hardens the fingerprint by sending the hashes of r primes. Plots
+    the false positive rate of each r against n, and against the number of bits sent.
+    :param rs: the numbers of primes to try
+    :param trials: for each n, average accross how many trials (shared by every r)
+    :param seed, workers, store, n_step: as in run_fingerprint_experiments
+    :return: None
+    """
+    results = compute_multi_prime_experiment(n_min, n_max, rs, trials, seed, workers, store, n_step)
+    label = plots.sample_label(trials, False)
 
-    plt.figure()
-    plt.plot(ns, no_remainder_rate_array, label=f'Regular Fingerprinting, ({trials} trials)', linewidth=2)
-    plt.plot(ns, remainder_1_rate_array, label=f'1-bit remainder added, ({trials} trials)', linewidth=1)
-    plt.xlabel('n')
-    plt.ylabel('Experimental False positive rate')
-    plt.title('Fingerprinting: False Positive Rate')
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.show()
+    with instrumentation.stage("plotting"):
+        plots.multi_prime_false_positive_rates(results, rs, label)
+        plots.multi_prime_rate_vs_bits(results, rs, label)
+    plots.show("multi_prime")
 
 
 if __name__ == '__main__':
     # Part 1 & 2: plot theoretical and empirical false positive rates for n=6..1000
-    run_fingerprint_experiments()
-    run_remainder_experiment()
-
+    # results are kept in results/ so the figures can be redrawn with render.py without recomputing them
+    store = result_store.ResultStore()
+    run_fingerprint_experiments(store=store)
+    run_remainder_experiment(store=store)
+    run_multi_prime_experiment(store=store)
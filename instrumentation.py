@@ -0,0 +1,100 @@
+#CS 5080
+#project 3 - opt-in counters and stage timers for the hot paths
+
+"""
+Counters (Miller-Rabin calls, early exits, modular exponentiations/squarings, the base that rejected each composite,
+fingerprinting trials, ...) and stage timers (sieve, each task, plotting), written as a JSON report when the program
+exits. Off by default; turn it on with
+
+    PROJECT3_INSTRUMENT=report.json python Deliverable_2.py
+
+or instrumentation.enable("report.json"). When it is off, call sites only pay for an `if instrumentation.ENABLED`
+check, and stage() hands back a shared no-op context manager.
+
+Counters are kept per process: work done in process pool workers (workers > 1) is not included.
+"""
+
+import atexit
+import contextlib
+import json
+import os
+import time
+from collections import defaultdict
+
+import progressbar
+
+ENABLED = False
+REPORT_PATH = None
+
+counters = defaultdict(int)
+timers = defaultdict(float)
+
+_NO_STAGE = contextlib.nullcontext()
+
+
+def enable(report_path="instrumentation.json"):
+    """
+    Start counting and timing; the report is written to report_path at exit (None: no file, see report()).
+    """
+    global ENABLED, REPORT_PATH
+    if not ENABLED and report_path is not None:
+        atexit.register(_write_at_exit)
+    ENABLED = True
+    REPORT_PATH = report_path
+
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+
+def count(name, k=1):
+    if ENABLED:
+        counters[name] += k
+
+
+@contextlib.contextmanager
+def _timed(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timers[name] += time.perf_counter() - start
+
+
+def stage(name):
+    """
+    Context manager adding the time spent inside it to the timer `name` (times add up over repeated stages).
+    """
+    return _timed(name) if ENABLED else _NO_STAGE
+
+
+def report():
+    """
+    Counters, timers (seconds) and, for every counter with a timer of the same name, its rate per second.
+    """
+    rates = {name: counters[name] / timers[name] for name in counters if timers.get(name)}
+    return {"counters": dict(counters), "timers": dict(timers), "rates_per_sec": rates}
+
+
+def write_report(path):
+    with open(path, "w") as f:
+        json.dump(report(), f, indent=2, sort_keys=True)
+
+
+def _write_at_exit():
+    if REPORT_PATH is not None:
+        write_report(REPORT_PATH)
+
+
+def progress_bar(max_value, unit="n"):
+    """
+    progressbar.ProgressBar that also shows the live throughput (units per second) and an ETA.
+    """
+    widgets = [progressbar.Percentage(), " ", progressbar.Bar(), " ",
+               progressbar.AdaptiveTransferSpeed(unit=unit), " ", progressbar.AdaptiveETA()]
+    return progressbar.ProgressBar(max_value=max_value, widgets=widgets)
+
+
+if os.environ.get("PROJECT3_INSTRUMENT"):
+    enable(os.environ["PROJECT3_INSTRUMENT"])
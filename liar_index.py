@@ -0,0 +1,125 @@
+#For CS 5080, SP2025
+#project 3 - array-backed index of the Miller–Rabin liars of a scan
+
+"""
+The liars found by mr_scan.scan_liars, kept as two parallel NumPy arrays: the sorted liar n values and, for each, the
+bitmask of the bases it fools (bit j <-> bases[j]). Which bases each n fooled is kept, not only how many, and the
+usual questions (histogram of the number of bases fooled, liars fooling every base of a set, top liars, liars in a
+range, false positives per base up to a checkpoint) are answered with vectorized operations instead of re-scanning.
+
+    index = liar_scan.index()
+    index.histogram()            # histogram[c] = liars fooling exactly c bases
+    index.fooling_all([2, 3])    # the n that are strong liars for both 2 and 3
+    index.save("liars.npz"); index = LiarIndex.load("liars.npz")
+"""
+
+import numpy as np
+
+from prime_table import _POPCOUNT
+
+
+def _popcounts(masks):
+    return _POPCOUNT[masks.view(np.uint8)].reshape(len(masks), 8).sum(axis=1, dtype=np.int64)
+
+
+class LiarIndex:
+
+    def __init__(self, bases, ns, masks, lo=None, hi=None):
+        self.bases = list(bases)
+        self.ns = np.ascontiguousarray(ns, dtype=np.int64)  # sorted liar n values
+        self.masks = np.ascontiguousarray(masks, dtype=np.int64)
+        self.lo = lo
+        self.hi = hi
+        self.counts = _popcounts(self.masks)  # counts[i] = number of bases ns[i] fools
+
+    def __len__(self):
+        return len(self.ns)
+
+    def columns(self):
+        """
+        The index as NumPy columns (the same columns as mr_scan.LiarScan.columns()).
+        """
+        lo_hi = [-1 if self.lo is None else self.lo, -1 if self.hi is None else self.hi]
+        return {"bases": np.array(self.bases, dtype=np.int64), "range": np.array(lo_hi, dtype=np.int64),
+                "ns": self.ns, "masks": self.masks}
+
+    @classmethod
+    def from_columns(cls, columns):
+        lo, hi = (None if v < 0 else v for v in columns["range"].tolist())
+        return cls(columns["bases"].tolist(), columns["ns"], columns["masks"], lo, hi)
+
+    def save(self, path):
+        np.savez(path, **self.columns())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls.from_columns({name: data[name] for name in data.files})
+
+    def mask_of(self, bases):
+        """
+        Bitmask of the given bases (ValueError for a base the index was not built with).
+        """
+        mask = 0
+        for a in bases:
+            mask |= 1 << self.bases.index(a)
+        return mask
+
+    def histogram(self):
+        """
+        histogram[c] = number of liars fooling exactly c of the bases, for c = 0 .. len(bases) (histogram[0] is 0).
+        """
+        return np.bincount(self.counts, minlength=len(self.bases) + 1)
+
+    def fooling_all(self, bases):
+        """
+        Sorted liars that are strong liars for every base in `bases`.
+        """
+        mask = self.mask_of(bases)
+        return self.ns[(self.masks & mask) == mask]
+
+    def fooling(self, a):
+        """
+        Sorted liars for the single base a.
+        """
+        return self.fooling_all([a])
+
+    def top(self, k):
+        """
+        The k liars fooling the most bases, as (ns, counts), most bases first and smaller n first among ties.
+        """
+        order = np.argsort(-self.counts, kind="stable")[:k]
+        return self.ns[order], self.counts[order]
+
+    def by_count(self):
+        """
+        All liars as (ns, counts), fewest bases first and smaller n first among ties.
+        """
+        order = np.argsort(self.counts, kind="stable")
+        return self.ns[order], self.counts[order]
+
+    def in_range(self, lo, hi):
+        """
+        The sub-index of the liars with lo <= n < hi (arrays are views, nothing is copied).
+        """
+        i, j = np.searchsorted(self.ns, [lo, hi])
+        sub = LiarIndex.__new__(LiarIndex)
+        sub.bases = self.bases
+        sub.ns = self.ns[i:j]
+        sub.masks = self.masks[i:j]
+        sub.counts = self.counts[i:j]
+        sub.lo = lo if self.lo is None else max(lo, self.lo)
+        sub.hi = hi if self.hi is None else min(hi, self.hi)
+        return sub
+
+    def false_counts(self, checkpoints):
+        """
+        Number of false positives per base for the liars n <= c at each checkpoint c.
+        :return: {base: [count at checkpoints[0], count at checkpoints[1], ...]}
+        """
+        ends = np.searchsorted(self.ns, checkpoints, side="right")
+        result = {}
+        for j, a in enumerate(self.bases):
+            cumulative = np.concatenate(([0], np.cumsum((self.masks >> j) & 1)))
+            result[a] = cumulative[ends].tolist()
+        return result
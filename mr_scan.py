@@ -0,0 +1,212 @@
+#For CS 5080, SP2025
+#project 3 - Miller–Rabin false-positive / liar scans over ranges of n
+
+"""
+Scan engines for the Deliverable_2 experiments. Instead of calling miller_rabin(n, bases=[a]) once per (n, a) pair and
+once more per range, each odd composite is visited once and tested against every base in that visit. The bases a
+composite fools are kept as a bitmask (bit i <-> bases[i]), so counts for any prefix of the range come from cumulative
+counts instead of re-scanning.
+"""
+
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import instrumentation
+import liar_index
+from primality import BATCH_LIMIT, SMALL_PRIMES, decompose, is_sprp, is_sprp_batch
+
+CHUNK = 1 << 20
+# more shards than workers so a slow shard does not leave the rest of the pool idle
+SHARDS_PER_WORKER = 8
+# 2*3*5*7 wheel: only the residues mod WHEEL coprime to it can be candidates
+WHEEL = 2 * 3 * 5 * 7
+WHEEL_RESIDUES = np.array([r for r in range(WHEEL) if math.gcd(r, WHEEL) == 1], dtype=np.int64)
+_OFF_WHEEL_PRIMES = [p for p in SMALL_PRIMES if WHEEL % p]
+
+
+def wheel_candidates(lo, hi, table, chunk=CHUNK):
+    """
+    Yield arrays of the odd composites in [lo, hi) with no prime factor <= 29 (the ones miller_rabin does not reject
+    in its small primes check), in increasing order, one chunk of the range at a time. Only the 48 residues mod 210
+    coprime to 2*3*5*7 are generated; the prime bitmap drops the primes and a check by 11..29 the rest.
+    :param table: prime_table.PrimeTable or prime_table.SegmentedSieve covering hi - 1 (a segmented sieve sieves
+        each chunk as it is reached, so memory stays bounded by the chunk wherever the range starts)
+    """
+    lo = max(lo, 4)
+    for c_lo in range(lo, hi, chunk):
+        c_hi = min(c_lo + chunk, hi)
+        first_odd = c_lo | 1
+        flags = table.odd_flags(c_lo, c_hi)
+        block = c_lo - c_lo % WHEEL
+        ns = (np.arange(block, c_hi, WHEEL, dtype=np.int64)[:, None] + WHEEL_RESIDUES).ravel()
+        ns = ns[(ns >= c_lo) & (ns < c_hi)]
+        ns = ns[~flags[(ns - first_odd) >> 1]]
+        if len(ns) and ns[0] == 1:
+            ns = ns[1:]  # 1 is neither prime nor composite
+        keep = np.ones(len(ns), dtype=bool)
+        for p in _OFF_WHEEL_PRIMES:
+            keep &= ns % p != 0
+        yield ns[keep]
+
+
+class LiarScan:
+    """
+    Result of scan_liars: the composites in the scanned range that fool at least one base, with their base bitmasks.
+    """
+
+    def __init__(self, bases, lo, hi, ns, masks):
+        self.bases = list(bases)
+        self.lo = lo
+        self.hi = hi
+        self.ns = ns  # sorted liar n values
+        self.masks = masks  # masks[i] bit j set <-> ns[i] is a strong liar for bases[j]
+
+    def columns(self):
+        """
+        The scan as NumPy columns, for result_store.ResultStore.
+        """
+        return {"bases": np.array(self.bases, dtype=np.int64), "range": np.array([self.lo, self.hi], dtype=np.int64),
+                "ns": np.array(self.ns, dtype=np.int64), "masks": np.array(self.masks, dtype=np.int64)}
+
+    @classmethod
+    def from_columns(cls, columns):
+        lo, hi = columns["range"].tolist()
+        return cls(columns["bases"].tolist(), lo, hi, columns["ns"].tolist(), columns["masks"].tolist())
+
+    def index(self):
+        """
+        The liars as a liar_index.LiarIndex, for histograms and queries over the base bitmasks.
+        """
+        return liar_index.LiarIndex(self.bases, self.ns, self.masks, self.lo, self.hi)
+
+    def false_counts(self, checkpoints):
+        """
+        Number of false positives per base for n in [lo, c] at each checkpoint c.
+        :return: {base: [count at checkpoints[0], count at checkpoints[1], ...]}
+        """
+        return self.index().false_counts(checkpoints)
+
+    def liar_counts(self):
+        """
+        {n: number of bases n fools} for every liar n.
+        """
+        return {n: bin(mask).count("1") for n, mask in zip(self.ns, self.masks)}
+
+
+def _shards(lo, hi, count):
+    """
+    Split [lo, hi) into at most count contiguous, non-empty shards.
+    """
+    step = max(-(-(hi - lo) // max(count, 1)), 1)
+    return [(s_lo, min(s_lo + step, hi)) for s_lo in range(lo, hi, step)]
+
+
+def _map_shards(shard_fn, lo, hi, args, workers, progress):
+    """
+    Run shard_fn(s_lo, s_hi, *args) over contiguous shards of [lo, hi), on a process pool when workers > 1.
+    Results are returned in shard order whatever order the workers finish in, so merging them is deterministic.
+    """
+    if workers > 1:
+        shards = _shards(lo, hi, workers * SHARDS_PER_WORKER)
+    else:
+        shards = _shards(lo, hi, -(-(hi - lo) // CHUNK))
+    results = []
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(shard_fn, s_lo, s_hi, *args) for s_lo, s_hi in shards]
+            for (s_lo, s_hi), future in zip(shards, futures):
+                results.append(future.result())
+                if progress is not None:
+                    progress(s_hi - lo)
+    else:
+        for s_lo, s_hi in shards:
+            results.append(shard_fn(s_lo, s_hi, *args))
+            if progress is not None:
+                progress(s_hi - lo)
+    return results
+
+
+def _sprp_masks(candidates, bases):
+    """
+    Bitmask per candidate of the bases it is a strong probable prime to (bit j <-> bases[j]). Batches below 2^32 run
+    through the vectorized test, larger n fall back to the scalar one.
+    """
+    if len(bases) > 63:
+        raise ValueError("at most 63 bases fit in a mask")
+    masks = np.zeros(len(candidates), dtype=np.int64)
+    if instrumentation.ENABLED:
+        instrumentation.count("mr_scan.sprp_tests", len(candidates) * len(bases))
+    if not len(candidates):
+        return masks
+    if candidates[-1] < BATCH_LIMIT:
+        for j, a in enumerate(bases):
+            masks |= is_sprp_batch(candidates, a).astype(np.int64) << j
+        return masks
+    for i, n in enumerate(candidates.tolist()):
+        d, s = decompose(n)
+        mask = 0
+        for j, a in enumerate(bases):
+            if is_sprp(n, a, d, s):
+                mask |= 1 << j
+        masks[i] = mask
+    return masks
+
+
+def _scan_liars_shard(lo, hi, bases, table):
+    ns = []
+    masks = []
+    for candidates in wheel_candidates(lo, hi, table):
+        candidate_masks = _sprp_masks(candidates, bases)
+        liars = candidate_masks != 0
+        ns.extend(candidates[liars].tolist())
+        masks.extend(candidate_masks[liars].tolist())
+    return ns, masks
+
+
+def _false_positives_shard(lo, hi, bases, table):
+    fp_ns = []
+    for survivors in wheel_candidates(lo, hi, table):
+        # each base only tests the composites that fooled all of the bases before it
+        for a in bases:
+            if not len(survivors):
+                break
+            passed = _sprp_masks(survivors, [a]) != 0
+            if instrumentation.ENABLED:
+                instrumentation.count(f"mr_scan.rejected_by_base.{a}", int((~passed).sum()))
+            survivors = survivors[passed]
+        fp_ns.append(survivors)
+    return np.concatenate(fp_ns) if fp_ns else np.zeros(0, dtype=np.int64)
+
+
+def scan_liars(lo, hi, bases, table, workers=1, progress=None):
+    """
+    Test every odd composite n in [lo, hi) against every base in one visit. A composite counts as a liar for base a
+    exactly when miller_rabin(n, bases=[a]) returns True.
+    :param table: prime_table.PrimeTable or SegmentedSieve used as ground truth (see prime_table.ground_truth)
+    :param workers: number of processes the range is sharded over
+    :param progress: optional callable, given the number of integers of the range scanned so far
+    :return: LiarScan
+    """
+    bases = list(bases)
+    ns = []
+    masks = []
+    for shard_ns, shard_masks in _map_shards(_scan_liars_shard, lo, hi, (bases, table), workers, progress):
+        ns.extend(shard_ns)
+        masks.extend(shard_masks)
+    return LiarScan(bases, lo, hi, ns, masks)
+
+
+def scan_false_positives(lo, hi, bases, table, workers=1, progress=None):
+    """
+    Every composite n in [lo, hi) that miller_rabin(n, bases=bases) reports as probably prime. The result is the same
+    for any number of workers.
+    :param table: prime_table.PrimeTable or SegmentedSieve used as ground truth (see prime_table.ground_truth)
+    :param workers: number of processes the range is sharded over
+    :param progress: optional callable, given the number of integers of the range scanned so far
+    :return: sorted int64 array of the false positives
+    """
+    bases = list(bases)
+    shard_results = _map_shards(_false_positives_shard, lo, hi, (bases, table), workers, progress)
+    return np.concatenate(shard_results) if shard_results else np.zeros(0, dtype=np.int64)
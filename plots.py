@@ -0,0 +1,223 @@
+#CS 5080
+#project 3 - figures of both deliverables
+
+"""
+Every figure of the project, drawn from computed (or stored) result columns. Each function opens a new figure and
+returns it; the scripts show it, render.py saves it to a file (with the non-interactive Agg backend).
+
+Line plots go through decimate(), so a series of millions of points is drawn from at most ~MAX_POINTS of them.
+The scripts display their figures through show(); with PROJECT3_FIGURES=<dir> set, it writes them to files there
+instead, on the non-interactive Agg backend (no display needed):
+
+    PROJECT3_FIGURES=figures python Deliverable_2.py
+"""
+
+import os
+
+import matplotlib
+
+SAVE_DIR = os.environ.get("PROJECT3_FIGURES")
+if SAVE_DIR:
+    matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+
+# most points drawn per line; a figure is only a couple of thousand pixels wide
+MAX_POINTS = 4000
+
+
+def decimate(xs, ys, max_points=MAX_POINTS):
+    """
+    At most ~max_points of the points (xs, ys) that look the same when drawn as a line: the points are split into
+    max_points / 2 equal buckets and each keeps its minimum and its maximum, in x order, so spikes are not lost the
+    way they are when taking every k-th point. Short series are returned as they are.
+    """
+    xs = np.asarray(xs)
+    ys = np.asarray(ys)
+    n = len(ys)
+    if n <= max_points:
+        return xs, ys
+    buckets = max(max_points // 2, 1)
+    size = -(-n // buckets)
+    padded = np.concatenate([ys, np.full(size * buckets - n, ys[-1], dtype=ys.dtype)]).reshape(buckets, size)
+    starts = np.arange(buckets) * size
+    keep = np.concatenate([starts + padded.argmin(axis=1), starts + padded.argmax(axis=1), [0, n - 1]])
+    keep = np.unique(np.minimum(keep, n - 1))
+    return xs[keep], ys[keep]
+
+
+def _line(xs, ys, **kwargs):
+    return plt.plot(*decimate(xs, ys), **kwargs)
+
+
+def show(name, fmt="png"):
+    """
+    plt.show() the open figures, or, when PROJECT3_FIGURES is set, save each as <dir>/<name>-<i>.<fmt> and close it.
+    """
+    if not SAVE_DIR:
+        plt.show()
+        return
+    os.makedirs(SAVE_DIR, exist_ok=True)
+    for i, num in enumerate(plt.get_fignums()):
+        fig = plt.figure(num)
+        fig.savefig(os.path.join(SAVE_DIR, f"{name}-{i + 1}.{fmt}"))
+        plt.close(fig)
+
+
+def sample_label(trials, exact, halfwidth=None):
+    if exact:
+        return "exact"
+    if halfwidth is not None:
+        return f"±{halfwidth} CI, ≤{trials} trials"
+    return f"{trials} trials"
+
+
+def _interval(results, ns, column):
+    # shade the confidence interval of a rate when the results have one (adaptive sweeps)
+    if f"{column}_lo" in results:
+        plt.fill_between(ns, results[f"{column}_lo"], results[f"{column}_hi"], alpha=0.2)
+
+
+# Deliverable 1 (fingerprinting_setup.py)
+
+def parity_false_positive_rates(results, label):
+    fig = plt.figure()
+    ns = results["n"]
+    _line(ns, results["no_parity_rate"], label=f'No parity, ({label})', linewidth=1)
+    _interval(results, ns, "no_parity_rate")
+    _line(ns, results["parity_1_rate"], label=f'1-bit parity, ({label})', linewidth=1)
+    _interval(results, ns, "parity_1_rate")
+    _line(ns, results["parity_2_rate"], label=f'2-bit parity, ({label})', linewidth=1)
+    _interval(results, ns, "parity_2_rate")
+    _line(ns, results["parity_4_rate"], label=f'4-bit parity, ({label})', linewidth=1)
+    _interval(results, ns, "parity_4_rate")
+    plt.xlabel('n')
+    plt.ylabel('Experimental False positive rate')
+    plt.title('Fingerprinting: False Positive Rate, X/Y Parity Checked')
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    return fig
+
+
+def parity_transmission_sizes(results, label):
+    fig = plt.figure()
+    data_size = results["data_size"]
+    _line(data_size, results["avg_no_parity_size"], label=f'No parity, ({label})')
+    _line(data_size, results["avg_parity_1_size"], label=f'1-bit parity, ({label})')
+    _line(data_size, results["avg_parity_2_size"], label=f'2-bit parity, ({label})')
+    _line(data_size, results["avg_parity_4_size"], label=f'4-bit parity, ({label})')
+    plt.xlabel('data size of Y (bits)')
+    plt.ylabel('Experimental Tranmission Size (bits)')
+    plt.title('Fingerprinting: Transmission Size With Parity')
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    return fig
+
+
+def remainder_false_positive_rates(results, label):
+    fig = plt.figure()
+    ns = results["n"]
+    _line(ns, results["no_remainder_rate"], label=f'Regular Fingerprinting, ({label})', linewidth=2)
+    _interval(results, ns, "no_remainder_rate")
+    _line(ns, results["remainder_1_rate"], label=f'1-bit remainder added, ({label})', linewidth=1)
+    _interval(results, ns, "remainder_1_rate")
+    plt.xlabel('n')
+    plt.ylabel('Experimental False positive rate')
+    plt.title('Fingerprinting: False Positive Rate')
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    return fig
+
+
+def _primes_label(r):
+    return f'{r} prime{"s" if r > 1 else ""}'
+
+
+def multi_prime_false_positive_rates(results, rs, label):
+    fig = plt.figure()
+    ns = results["n"]
+    for r in rs:
+        _line(ns, results[f"primes_{r}_rate"], label=f'{_primes_label(r)}, ({label})', linewidth=1)
+    plt.xlabel('n')
+    plt.ylabel('Experimental False positive rate')
+    plt.title('Fingerprinting: False Positive Rate, r Primes Sent')
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    return fig
+
+
+def multi_prime_rate_vs_bits(results, rs, label):
+    fig = plt.figure()
+    for r in rs:
+        _line(results[f"avg_primes_{r}_size"], results[f"primes_{r}_rate"], label=f'{_primes_label(r)}, ({label})',
+              linestyle="none", marker=".", markersize=3)
+    plt.xlabel('Experimental Tranmission Size (bits)')
+    plt.ylabel('Experimental False positive rate')
+    plt.title('Fingerprinting: False Positive Rate vs Bits Sent, r Primes')
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    return fig
+
+
+# Deliverable 2
+
+def rolling_false_positive_rate(ns, rolling, window, bases):
+    fig = plt.figure()
+    _line(ns, rolling)
+    plt.xlabel("n")
+    plt.ylabel(f"False-positive rate (window={window})")
+    plt.title(f"Rolling false-positive rate of Miller–Rabin (bases {bases})")
+    plt.tight_layout()
+    return fig
+
+
+def base_false_counts(checkpoints, false_counts_all):
+    """
+    False counts of each "A" across the ranges of n, to see the change/trajectory.
+    """
+    fig = plt.figure()
+    plot_count = 0
+    for a, cnt in sorted(false_counts_all.items(), key=lambda x: x[0], reverse=True):
+        line_type = "-"
+        if plot_count % 2 == 0:
+            line_type = "--"
+        plot_count += 1
+        plt.plot(checkpoints, cnt, label=f"Base 'A' = {a}", linestyle=line_type)
+    plt.xscale('log')
+    plt.xlabel("n (log scale)")
+    plt.ylabel(f"FPs by Base 'A's chosen")
+    plt.title("Determining which Miller–Rabin 'A' bases yield more FPs")
+    #plt.tight_layout()
+    plt.legend()
+    return fig
+
+
+def liar_histogram(histogram, n_bases, max_n):
+    """
+    Which composite numbers have the most liars: number of liars by how many of the n_bases bases they fool.
+    :param histogram: histogram[c] = number of liars fooling exactly c bases (liar_index.LiarIndex.histogram())
+    """
+    nonzero = [c for c in range(1, len(histogram)) if histogram[c]]
+    biggest = nonzero[-1] if nonzero else 0
+
+    categories = list(range(1, biggest + 1))
+    values = [int(v) for v in histogram[1:biggest + 1]]
+
+    # Create the bar plot
+    fig = plt.figure()
+    plt.bar(categories, values, color='skyblue')
+
+    # Add labels and title
+    plt.xlabel(f"Number of times a Liar Lies out of {n_bases} bases")
+    plt.ylabel(f'The Amount of Liars found, 0 to "n" = {max_n}')
+    plt.title('Showing Liars That Lie Multiple Times')
+
+    # Add value labels on top of bars
+    for index, value in enumerate(values):
+        plt.text(index + 1, value + 0.5, str(value), ha='center', va='center')
+    return fig
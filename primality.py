@@ -0,0 +1,222 @@
+#For CS 5080, SP2025
+#project 3 - Miller–Rabin test shared by Deliverable_2 and the scan engines
+#Author: Base code originally made by chatGPT. Andy Worcester then modified and expanded it.
+
+import random
+
+import numpy as np
+
+import arith_backend
+import instrumentation
+
+SMALL_PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]
+# miller_rabin with these bases has no false positive below DETERMINISTIC_LIMIT (Sorenson & Webster, 2015)
+DETERMINISTIC_BASES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41]
+DETERMINISTIC_LIMIT = 3317044064679887385961981
+# the batch functions square residues < n in uint64, so n has to stay below 2^32
+BATCH_LIMIT = 1 << 32
+
+
+def decompose(n):
+    """
+    Write n-1 = d * 2^s with d odd.
+    :return: (d, s)
+    """
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    return d, s
+
+
+def is_sprp(n, a, d, s):
+    """
+    True if odd n (with n-1 = d * 2^s) is a strong probable prime to base a.
+    """
+    if instrumentation.ENABLED:
+        return _is_sprp_counted(n, a, d, s)
+    modexp = arith_backend.BACKEND.modexp
+    x = modexp(a, d, n)
+    if x == 1 or x == n - 1:
+        return True
+    for _ in range(s - 1):
+        x = modexp(x, 2, n)
+        if x == n - 1:
+            return True
+    return False
+
+
+def _is_sprp_counted(n, a, d, s):
+    # is_sprp, counting the modular exponentiations and squarings it does
+    modexp = arith_backend.BACKEND.modexp
+    instrumentation.count("miller_rabin.modexps")
+    x = modexp(a, d, n)
+    if x == 1 or x == n - 1:
+        return True
+    for _ in range(s - 1):
+        instrumentation.count("miller_rabin.squarings")
+        x = modexp(x, 2, n)
+        if x == n - 1:
+            return True
+    return False
+
+
+def miller_rabin(n, bases=None, k=5):
+    """Return False for composite, True for probably prime."""
+    if instrumentation.ENABLED:
+        instrumentation.count("miller_rabin.calls")
+    if n < 2:
+        return False
+    # small primes check
+    for p in SMALL_PRIMES:
+        if n == p:
+            return True
+        if n % p == 0:
+            if instrumentation.ENABLED:
+                instrumentation.count("miller_rabin.small_prime_exits")
+            return False
+    # write n-1 = d * 2^s
+    d, s = decompose(n)
+
+    # Alternative method doesn't take advantage of %n improvements each iteration so is much longer for large "n":
+    """
+    if bases is None:
+        bases = [random.randrange(2, n-1) for _ in range(k)]
+    for a in bases:
+        spp = False
+        x1 = pow(a, d)
+        x = x1 % n
+        if x == 1 or x == n-1:
+            spp = True
+        if not spp:
+            for _ in range(s-1):
+                x1 = pow(x1, 2)
+                x2 = x1 % n
+                if x2 == n-1:
+                    spp = True
+                    break
+        if not spp:
+            return False
+    return True
+    """
+    # choose bases
+    if bases is None:
+        bases = [random.randrange(2, n - 1) for _ in range(k)]
+    for a in bases:
+        if not is_sprp(n, a, d, s):
+            if instrumentation.ENABLED:
+                instrumentation.count(f"miller_rabin.rejected_by_base.{a}")
+            return False
+    return True
+
+
+def is_prime(n, k=20):
+    """
+    Primality of n without a table: exact below DETERMINISTIC_LIMIT, above it wrong with probability below 4^-k.
+    """
+    if n <= DETERMINISTIC_BASES[-1]:
+        return n in DETERMINISTIC_BASES
+    if n < DETERMINISTIC_LIMIT:
+        return miller_rabin(n, bases=DETERMINISTIC_BASES)
+    return miller_rabin(n, bases=DETERMINISTIC_BASES) and miller_rabin(n, k=k)
+
+
+def _check_batch(ns):
+    ns = np.asarray(ns, dtype=np.int64)
+    if ns.size and (ns.min() < 0 or ns.max() >= BATCH_LIMIT):
+        raise ValueError(f"batch Miller-Rabin needs 0 <= n < {BATCH_LIMIT}")
+    return ns
+
+
+def _reduce_batch(a, n):
+    """
+    Element-wise a mod n for a Python int a of any size and a uint64 array n < 2^32, one 32-bit limb at a time.
+    """
+    r = np.zeros(n.shape, dtype=np.uint64)
+    limbs = []
+    a_abs = abs(a)
+    while a_abs:
+        limbs.append(a_abs & 0xFFFFFFFF)
+        a_abs >>= 32
+    for limb in reversed(limbs):
+        r = ((r << np.uint64(32)) % n + np.uint64(limb)) % n
+    if a < 0:
+        r = (n - r) % n
+    return r
+
+
+def _powmod_batch(base, exp, mod):
+    """
+    Element-wise base^exp mod mod for uint64 arrays with mod < 2^32 (so every product fits in 64 bits).
+    """
+    result = np.ones_like(mod)
+    base = base % mod
+    exp = exp.copy()
+    while exp.any():
+        odd = (exp & 1).astype(bool)
+        result = np.where(odd, result * base % mod, result)
+        base = base * base % mod
+        exp >>= 1
+    return result
+
+
+def is_sprp_batch(ns, a):
+    """
+    Element-wise is_sprp for an array of odd n >= 3, all below 2^32.
+    :return: boolean array, True where n is a strong probable prime to base a
+    """
+    n = _check_batch(ns).astype(np.uint64)
+    d = n - 1
+    s = np.zeros(n.shape, dtype=np.int64)
+    even = (d & 1) == 0
+    while even.any():
+        d[even] >>= 1
+        s[even] += 1
+        even = (d & 1) == 0
+
+    x = _powmod_batch(_reduce_batch(a, n), d, n)
+    n_minus_1 = n - 1
+    ok = (x == 1) | (x == n_minus_1)
+    for r in range(1, int(s.max(initial=0))):
+        x = x * x % n
+        ok |= (x == n_minus_1) & (r < s)
+    return ok
+
+
+def miller_rabin_batch(ns, bases):
+    """
+    Vectorized miller_rabin(n, bases=bases) over an array of 0 <= n < 2^32.
+    :return: boolean SPRP mask, equal element by element to the scalar function
+    """
+    ns = _check_batch(ns)
+    if instrumentation.ENABLED:
+        instrumentation.count("miller_rabin_batch.calls")
+        instrumentation.count("miller_rabin_batch.n", ns.size)
+    small_prime = np.isin(ns, SMALL_PRIMES)
+    candidate = ns >= 2
+    for p in SMALL_PRIMES:
+        candidate &= ns % p != 0
+    result = small_prime.copy()
+    idx = np.flatnonzero(candidate)
+    if instrumentation.ENABLED:
+        small_prime_exits = int((~candidate & ~small_prime & (ns >= 2)).sum())
+        instrumentation.count("miller_rabin_batch.small_prime_exits", small_prime_exits)
+    for a in bases:
+        if not len(idx):
+            break
+        passed = is_sprp_batch(ns[idx], a)
+        if instrumentation.ENABLED:
+            instrumentation.count("miller_rabin_batch.modexps", len(idx))
+            instrumentation.count(f"miller_rabin_batch.rejected_by_base.{a}", int((~passed).sum()))
+        idx = idx[passed]
+    result[idx] = True
+    return result
+
+
+def is_prime_batch(ns):
+    """
+    Element-wise primality of an array of 0 <= n < 2^32, exact: bases 2, 7 and 61 have no common strong liar below
+    4,759,123,141 (Jaeschke, 1993).
+    """
+    ns = _check_batch(ns)
+    return miller_rabin_batch(ns, [2, 7, 61]) | (ns == 61)  # 61 is its own base, which is 0 mod 61
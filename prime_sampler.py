@@ -0,0 +1,73 @@
+#CS 5080
+#project 3 - random primes for fingerprinting without a prime table
+
+"""
+Uniformly random primes in (n, n^2] for any n, without sieving: random integers of the range are drawn and the first
+primes among them kept (rejection sampling, so every prime of the range is equally likely). About one candidate in
+ln(n^2) is prime, so a prime costs a few dozen Miller-Rabin tests whatever the size of the range. Below 2^32 the
+candidates are tested in NumPy batches with the exact primality.is_prime_batch, above it with primality.is_prime
+(exact below 3.3e24).
+
+    p = random_prime(10**5)               # one prime in (10^5, 10^10]
+    ps = random_primes(10**5, 10000)      # 10000 of them, as a NumPy array
+"""
+
+import math
+import random
+
+import numpy as np
+
+from primality import BATCH_LIMIT, SMALL_PRIMES, is_prime, is_prime_batch
+
+# largest n whose range (n, n^2] fits in int64, for random_primes
+INT64_N = math.isqrt(2**63 - 1)
+
+
+def _bounds(n):
+    n = max(n, 2)
+    return n + 1, n * n
+
+
+def random_prime(n, rng=random):
+    """
+    A uniformly random prime in (n, n^2].
+    """
+    lo, hi = _bounds(n)
+    while True:
+        candidate = rng.randrange(lo, hi + 1)
+        if is_prime(candidate):
+            return candidate
+
+
+def random_primes(n, count, rng=random):
+    """
+    `count` independent uniformly random primes in (n, n^2], drawn in batches.
+    :param rng: random.Random the draws are derived from (a NumPy generator is seeded from it)
+    :return: int64 array (an object array of Python ints for n > INT64_N, whose primes do not fit in int64)
+    """
+    if n > INT64_N:
+        return np.array([random_prime(n, rng) for _ in range(count)], dtype=object)
+    lo, hi = _bounds(n)
+    generator = np.random.default_rng(rng.getrandbits(64))
+    found = []
+    total = 0
+    while total < count:
+        # about 1 in ln(hi) integers of the range is prime; draw a little more than enough for what is missing
+        size = int((count - total) * math.log(hi) * 1.2) + 64
+        candidates = generator.integers(lo, hi + 1, size=size, dtype=np.int64)
+        primes = candidates[_is_prime_array(candidates)][:count - total]
+        found.append(primes)
+        total += len(primes)
+    return np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+
+
+def _is_prime_array(ns):
+    if len(ns) == 0 or ns.max() < BATCH_LIMIT:
+        return is_prime_batch(ns)
+    # small prime factors are ruled out vectorized, only the rest go through the scalar test
+    mask = np.ones(len(ns), dtype=bool)
+    for p in SMALL_PRIMES:
+        mask &= (ns % p != 0) | (ns == p)
+    idx = np.flatnonzero(mask)
+    mask[idx] = [is_prime(n) for n in ns[idx].tolist()]
+    return mask
@@ -0,0 +1,312 @@
+#CS 5080
+#project 3 - prime table shared by both deliverables
+
+"""
+Odd-only, bit-packed prime table. Bit i of the bitmap is set when 2*i + 1 is prime, so a table up to 10^7 takes
+~625 KB instead of a list of 10^7 Python bools plus a list/set of Python ints.
+
+The sieved bitmap is saved to a cache file and memory-mapped by later runs, so only the first run pays for the sieve.
+Beyond what a bitmap comfortably holds, SegmentedSieve answers the same range queries by sieving each window on
+demand, with memory bounded by the window size.
+"""
+
+import math
+import os
+
+import numpy as np
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".prime_cache")
+
+# largest limit ground_truth() builds a full table for; above it windows are sieved on demand
+TABLE_LIMIT = 10**8
+# default window width of SegmentedSieve.windows
+WINDOW = 1 << 20
+
+# number of set bits in each possible byte value
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def sieve_odd_bits(limit):
+    """
+    Sieve of Eratosthenes over the odd numbers only.
+    :param limit: largest number covered by the table
+    :return: packed (little bit order) uint8 bitmap, bit i set if 2*i + 1 <= limit is prime
+    """
+    size = (limit + 1) // 2
+    flags = np.ones(size, dtype=bool)
+    if size:
+        flags[0] = False  # 1 is not prime
+    for i in range(1, (math.isqrt(max(limit, 0)) - 1) // 2 + 1):
+        if flags[i]:
+            p = 2 * i + 1
+            flags[p * p // 2::p] = False  # odd multiples of p are p apart in index space
+    return np.packbits(flags, bitorder="little")
+
+
+def _unpack_odd(bits, lo, hi):
+    """
+    The flags of the odd numbers in [lo, hi) (0 <= lo) from an odd-only bitmap (bit i <-> 2*i + 1, little bit order),
+    unpacking only the bytes that cover them.
+    """
+    i_lo, i_hi = lo // 2, hi // 2  # indices of the odd numbers >= lo and < hi
+    if i_hi <= i_lo:
+        return np.zeros(0, dtype=bool)
+    b_lo, b_hi = i_lo >> 3, (i_hi + 7) >> 3
+    flags = np.unpackbits(np.asarray(bits[b_lo:b_hi]), bitorder="little").view(bool)
+    return flags[i_lo - 8 * b_lo:i_hi - 8 * b_lo]
+
+
+class _RangeQueries:
+    """
+    The range queries shared by PrimeTable and SegmentedSieve, built on their odd_flags(lo, hi).
+    """
+
+    def is_prime_mask(self, lo, hi):
+        """
+        Boolean array m with m[k] True iff lo + k is prime, for lo + k in [lo, hi).
+        """
+        lo = max(lo, 0)
+        mask = np.zeros(max(hi - lo, 0), dtype=bool)
+        if hi <= lo:
+            return mask
+        mask[(lo | 1) - lo::2] = self.odd_flags(lo, hi)
+        if lo <= 2 < hi:
+            mask[2 - lo] = True
+        return mask
+
+    def primes_in(self, lo, hi):
+        """
+        All primes p with lo <= p < hi, as an int64 array.
+        """
+        lo = max(lo, 0)
+        odd = np.flatnonzero(self.odd_flags(lo, hi)).astype(np.int64) * 2 + (lo | 1)
+        if lo <= 2 < hi:
+            odd = np.concatenate([np.array([2], dtype=np.int64), odd])
+        return odd
+
+
+class PrimeTable(_RangeQueries):
+    """
+    Primality lookups for 0 <= n <= limit backed by an odd-only bitmap.
+    """
+
+    def __init__(self, bits, limit):
+        self.bits = bits
+        self.limit = limit
+        self._view = memoryview(np.ascontiguousarray(bits))
+        self._rank = None
+
+    def __reduce__(self):
+        # a memory-mapped table is sent to worker processes as its cache file name instead of its contents
+        if isinstance(self.bits, np.memmap) and self.bits.filename:
+            return _open_cached, (self.bits.filename, self.limit)
+        return PrimeTable, (np.asarray(self.bits), self.limit)
+
+    def __contains__(self, n):
+        return self.is_prime(n)
+
+    def _check(self, n):
+        if n > self.limit:
+            raise ValueError(f"{n} is beyond the prime table limit {self.limit}")
+
+    def is_prime(self, n):
+        if n < 3:
+            return n == 2
+        if not n & 1:
+            return False
+        self._check(n)
+        i = n >> 1
+        return bool((self._view[i >> 3] >> (i & 7)) & 1)
+
+    def odd_flags(self, lo, hi):
+        """
+        Primality flags of the odd numbers in [lo, hi), in increasing order (2 is never included).
+        """
+        lo = max(lo, 0)
+        if hi <= lo:
+            return np.zeros(0, dtype=bool)
+        self._check(hi - 1)
+        return _unpack_odd(self.bits, lo, hi)
+
+    def _ranks(self):
+        # _rank[b] = number of set bits in bytes [0, b)
+        if self._rank is None:
+            self._rank = np.zeros(len(self.bits) + 1, dtype=np.int64)
+            np.cumsum(_POPCOUNT[np.asarray(self.bits)], out=self._rank[1:])
+        return self._rank
+
+    def pi(self, x):
+        """
+        Number of primes <= x.
+        """
+        if x < 2:
+            return 0
+        self._check(x)
+        i = (x + 1) // 2  # odd numbers <= x have indices < i
+        b, r = i >> 3, i & 7
+        count = int(self._ranks()[b])
+        if r:
+            count += int(_POPCOUNT[self._view[b] & ((1 << r) - 1)])
+        return count + 1  # + the prime 2
+
+    def count(self, lo, hi):
+        """
+        Number of primes p with lo <= p < hi.
+        """
+        if hi <= lo:
+            return 0
+        return self.pi(hi - 1) - self.pi(lo - 1)
+
+    def nth(self, k):
+        """
+        The k-th prime, 1-indexed (nth(1) == 2).
+        """
+        if k < 1:
+            raise IndexError("primes are 1-indexed")
+        if k == 1:
+            return 2
+        j = k - 1  # j-th odd prime
+        rank = self._ranks()
+        if j > rank[-1]:
+            raise IndexError(f"the table up to {self.limit} holds only {int(rank[-1]) + 1} primes")
+        b = int(np.searchsorted(rank, j, side="left")) - 1
+        need = j - int(rank[b])
+        byte = self._view[b]
+        for bit in range(8):
+            if byte >> bit & 1:
+                need -= 1
+                if need == 0:
+                    return 2 * (8 * b + bit) + 1
+
+
+class SegmentedSieve(_RangeQueries):
+    """
+    Primality of any window [lo, hi) with hi - 1 <= limit, sieved on demand by the primes up to sqrt(limit), so the
+    memory used is that of the window (plus the ~sqrt(limit) base primes) wherever the window starts. Has the range
+    queries of PrimeTable (odd_flags, and is_prime_mask and primes_in from _RangeQueries) and can be used in its place by
+    the scans.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        base = load(math.isqrt(max(limit, 0)))
+        self._base = base.primes_in(3, math.isqrt(max(limit, 0)) + 1)  # odd base primes
+
+    def _check(self, n):
+        if n > self.limit:
+            raise ValueError(f"{n} is beyond the segmented sieve limit {self.limit}")
+
+    def odd_flags(self, lo, hi):
+        """
+        Primality flags of the odd numbers in [lo, hi), in increasing order (2 is never included).
+        """
+        lo = max(lo, 0)
+        if hi <= lo:
+            return np.zeros(0, dtype=bool)
+        self._check(hi - 1)
+        i_lo, i_hi = lo // 2, hi // 2  # indices of the odd numbers >= lo and < hi
+        flags = np.ones(max(i_hi - i_lo, 0), dtype=bool)
+        if not len(flags):
+            return flags
+        first_odd = 2 * i_lo + 1
+        if first_odd == 1:
+            flags[0] = False  # 1 is not prime
+        base = self._base[self._base * self._base < hi]
+        # first odd multiple of each base prime that is >= its square and inside the window
+        starts = np.maximum(base * base, -(-first_odd // base) * base)
+        starts += base * (starts % 2 == 0)
+        for p, k in zip(base.tolist(), ((starts - first_odd) // 2).tolist()):
+            flags[k::p] = False  # odd multiples of p are p apart in index space
+        return flags
+
+    def is_prime(self, n):
+        return bool(self.is_prime_mask(n, n + 1)[0]) if n >= 0 else False
+
+    def __contains__(self, n):
+        return self.is_prime(n)
+
+    def windows(self, lo, hi, width=WINDOW):
+        """
+        Yield (w_lo, w_hi, mask) for consecutive windows [w_lo, w_hi) of at most `width` numbers covering [lo, hi),
+        mask[k] True iff w_lo + k is prime. Only one window is held in memory at a time.
+        """
+        for w_lo in range(max(lo, 0), hi, width):
+            w_hi = min(w_lo + width, hi)
+            yield w_lo, w_hi, self.is_prime_mask(w_lo, w_hi)
+
+
+def ground_truth(limit, cache_dir=CACHE_DIR):
+    """
+    Primality of 0 <= n <= limit for the scans: the cached PrimeTable up to TABLE_LIMIT, a SegmentedSieve above it.
+    """
+    if limit <= TABLE_LIMIT:
+        return load(limit, cache_dir)
+    return SegmentedSieve(limit)
+
+
+def _cache_path(cache_dir, limit, prefix="odd_primes_"):
+    return os.path.join(cache_dir, f"{prefix}{limit}.npy")
+
+
+def _cached_limits(cache_dir, prefix="odd_primes_"):
+    """
+    The limits of the cached bitmaps named <prefix><limit>.npy in cache_dir.
+    """
+    limits = []
+    if os.path.isdir(cache_dir):
+        for name in os.listdir(cache_dir):
+            if name.startswith(prefix) and name.endswith(".npy"):
+                try:
+                    limits.append(int(name[len(prefix):-len(".npy")]))
+                except ValueError:
+                    continue
+    return limits
+
+
+def _new_cached(path, size):
+    """
+    A zeroed uint8 bitmap of `size` bytes to fill and then pass to _store_cached: memory-mapped on a temporary file
+    next to path, so it does not have to fit in memory, or in memory when the cache cannot be written.
+    """
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return np.lib.format.open_memmap(path + ".tmp", mode="w+", dtype=np.uint8, shape=(size,))
+    except OSError:
+        return np.zeros(size, dtype=np.uint8)
+
+
+def _store_cached(path, bits):
+    """
+    Move a bitmap (from _new_cached, or any uint8 array) into the cache at path; the file only appears once complete.
+    :return: the cached file memory-mapped read-only, or bits itself when the cache cannot be written
+    """
+    try:
+        if isinstance(bits, np.memmap) and bits.filename:
+            bits.flush()
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, bits)
+        os.replace(path + ".tmp", path)
+    except OSError:
+        return bits  # caching is only an optimisation
+    return np.load(path, mmap_mode="r")
+
+
+def _open_cached(path, limit):
+    return PrimeTable(np.load(path, mmap_mode="r"), limit)
+
+
+def load(limit, cache_dir=CACHE_DIR):
+    """
+    Return a PrimeTable covering [0, limit]. A cached table with the same or a larger limit is memory-mapped if one
+    exists; otherwise the table is sieved and written to the cache for the next run.
+    """
+    limit = max(limit, 64)  # keeps the bitmap non-empty so it can always be memory-mapped
+    cached = [cached_limit for cached_limit in _cached_limits(cache_dir) if cached_limit >= limit]
+    if cached:
+        cached_limit = min(cached)
+        return _open_cached(_cache_path(cache_dir, cached_limit), cached_limit)
+
+    bits = _store_cached(_cache_path(cache_dir, limit), sieve_odd_bits(limit))
+    return PrimeTable(bits, limit)
@@ -0,0 +1,88 @@
+#CS 5080
+#project 3 - product trees for the big-integer parts of the fingerprinting experiments
+
+"""
+Balanced product trees. Multiplying a long list of primes one at a time multiplies an ever growing big int by a small
+one at every step (quadratic overall); multiplying neighbours pairwise, level by level, keeps the operands of each
+multiplication about the same size, so Python's Karatsuba multiplication does the heavy lifting.
+"""
+
+import math
+
+import numpy as np
+
+import arith_backend
+
+
+def product(values):
+    """
+    Product of a sequence of ints, multiplied as a balanced tree by the current arithmetic backend
+    (arith_backend.BACKEND). The product of an empty sequence is 1.
+    """
+    return arith_backend.BACKEND.product(values)
+
+
+class RemainderTree:
+    """
+    Subproduct tree over a fixed list of moduli (each below 2^32, e.g. the primes of a range), giving y mod m for every
+    modulus at once: y is reduced modulo the products at the top of the tree, then each remainder modulo the two halves
+    below it, down to groups of LEAF moduli. Those last reductions are finished for all moduli together with NumPy, 32
+    bits of the group remainder at a time. Build the tree once per list of moduli and reuse it for any number of y.
+
+    Levels are only multiplied up as far as the largest y needs: once every node of a level is longer than y, reducing
+    y by it is a no-op, so the tree for a ~1000 bit y over 10^5 primes stops well below the full product.
+    """
+    LEAF = 16
+
+    def __init__(self, moduli):
+        self.moduli = np.ascontiguousarray(moduli, dtype=np.uint64)
+        values = self.moduli.tolist()
+        # levels[0] = product of each group of LEAF moduli, levels[i + 1] = products of neighbouring pairs of levels[i]
+        self.levels = [[math.prod(values[i:i + self.LEAF]) for i in range(0, len(values), self.LEAF)]]
+        self._shortest = [min((m.bit_length() for m in self.levels[0]), default=0)]  # shortest node of each level
+        self._group_of = np.arange(len(values)) // self.LEAF
+        self._limbs = -(-max((g.bit_length() for g in self.levels[0]), default=0) // 32)
+
+    def __len__(self):
+        return len(self.moduli)
+
+    def _top(self, bits):
+        """
+        Index of the lowest level whose nodes are all longer than `bits` bits (or the root), building it if needed.
+        """
+        top = 0
+        while len(self.levels[top]) > 1 and self._shortest[top] <= bits:
+            top += 1
+            if top == len(self.levels):
+                level = self.levels[-1]
+                level = [level[i] * level[i + 1] if i + 1 < len(level) else level[i] for i in range(0, len(level), 2)]
+                self.levels.append(level)
+                self._shortest.append(min(m.bit_length() for m in level))
+        return top
+
+    def remainders(self, y):
+        """
+        y mod m for every modulus m, as an int64 array in the order of the moduli.
+        """
+        if not len(self.moduli):
+            return np.zeros(0, dtype=np.int64)
+        y = int(y)
+        top = self._top(y.bit_length())
+        rests = [y % m for m in self.levels[top]]
+        for level in reversed(self.levels[:top]):
+            rests = [rests[i >> 1] % m for i, m in enumerate(level)]
+
+        # each group remainder as big-endian 32-bit limbs, then Horner's rule modulo every modulus of its group
+        width = 4 * self._limbs
+        limbs = np.frombuffer(b"".join(int(r).to_bytes(width, "big") for r in rests), dtype=">u4")
+        limbs = limbs.reshape(len(rests), self._limbs).astype(np.uint64)[self._group_of]
+        r = np.zeros(len(self.moduli), dtype=np.uint64)
+        for j in range(self._limbs):
+            r = ((r << np.uint64(32)) % self.moduli + limbs[:, j]) % self.moduli
+        return r.astype(np.int64)
+
+    def remainders_many(self, ys):
+        """
+        remainders(y) for each y of ys, all against this tree.
+        """
+        return [self.remainders(y) for y in ys]
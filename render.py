@@ -0,0 +1,85 @@
+#CS 5080
+#project 3 - headless rendering of the stored results
+
+"""
+Writes every figure of the stored results (see result_store.py) to image files, without recomputing anything and
+without opening any window. Run the experiment scripts once to fill results/, then:
+
+    python render.py [results dir] [figures dir]
+"""
+
+import os
+import sys
+
+import matplotlib
+matplotlib.use("Agg")  # non-interactive backend, must be picked before pyplot is imported
+import matplotlib.pyplot as plt
+
+import liar_index
+import plots
+import result_store
+
+FIGURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "figures")
+
+
+def _fingerprint_figures(columns, params):
+    label = plots.sample_label(params["trials"], params["exact"], params.get("halfwidth"))
+    return [plots.parity_false_positive_rates(columns, label), plots.parity_transmission_sizes(columns, label)]
+
+
+def _remainder_figures(columns, params):
+    return [plots.remainder_false_positive_rates(columns, plots.sample_label(params["trials"], params["exact"], params.get("halfwidth")))]
+
+
+def _multi_prime_figures(columns, params):
+    label = plots.sample_label(params["trials"], False)
+    return [plots.multi_prime_false_positive_rates(columns, params["rs"], label),
+            plots.multi_prime_rate_vs_bits(columns, params["rs"], label)]
+
+
+def _rolling_fp_figures(columns, params):
+    return [plots.rolling_false_positive_rate(columns["n"], columns["rolling"], params["window"], params["bases"])]
+
+
+def _liar_scan_figures(columns, params):
+    index = liar_index.LiarIndex.from_columns(columns)
+    max_n = index.hi - 1
+    checkpoints = [int(max_n/100), int(max_n/10), max_n]
+    return [plots.base_false_counts(checkpoints, index.false_counts(checkpoints)),
+            plots.liar_histogram(index.histogram(), len(index.bases), max_n)]
+
+
+FIGURES = {
+    "fingerprint": _fingerprint_figures,
+    "remainder": _remainder_figures,
+    "multi_prime": _multi_prime_figures,
+    "rolling_fp": _rolling_fp_figures,
+    "liar_scan": _liar_scan_figures,
+}
+
+
+def render_all(store, out_dir=FIGURES_DIR, fmt="png"):
+    """
+    Save the figures of every stored run as <run>-<i>.<fmt> in out_dir.
+    :return: list of the files written
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for stem, columns, meta in store.entries():
+        if meta["name"] not in FIGURES:
+            continue
+        if not meta["complete"]:
+            print(f"{stem}: sweep not finished, drawing the part computed so far")
+        for i, fig in enumerate(FIGURES[meta["name"]](columns, meta["params"])):
+            path = os.path.join(out_dir, f"{stem}-{i + 1}.{fmt}")
+            fig.savefig(path)
+            plt.close(fig)
+            written.append(path)
+    return written
+
+
+if __name__ == '__main__':
+    results_dir = sys.argv[1] if len(sys.argv) > 1 else result_store.RESULTS_DIR
+    figures_dir = sys.argv[2] if len(sys.argv) > 2 else FIGURES_DIR
+    for path in render_all(result_store.ResultStore(results_dir), figures_dir):
+        print(path)
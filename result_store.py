@@ -0,0 +1,72 @@
+#CS 5080
+#project 3 - on-disk store for the computed sweep results
+
+"""
+Columnar result store. Each experiment run is one .npz file of NumPy columns (per-n rates, sizes, counts per base,
+the liar table, ...) named after the experiment and a hash of its parameters, with the parameters and run metadata
+saved next to the columns. Figures can then be redrawn from the stored columns (see render.py) and interrupted sweeps
+pick up from the last saved n (see sweep.run_stored_sweep) instead of recomputing everything.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+_META = "__meta__"
+
+
+class ResultStore:
+
+    def __init__(self, root=RESULTS_DIR):
+        self.root = root
+
+    def path(self, name, params):
+        key = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+        return os.path.join(self.root, f"{name}-{key}.npz")
+
+    def save(self, name, params, columns, complete=True, **extra):
+        """
+        Save the columns of one run, replacing any earlier save of the same (name, params).
+        :param columns: {column name: array-like}
+        :param complete: False while a sweep is still being filled in
+        :param extra: more JSON-serialisable metadata to keep with the run (e.g. the seed used)
+        """
+        os.makedirs(self.root, exist_ok=True)
+        meta = dict(extra, name=name, params=params, complete=complete)
+        arrays = {column: np.asarray(values) for column, values in columns.items()}
+        arrays[_META] = np.array(json.dumps(meta))
+        path = self.path(name, params)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    def _read(self, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data[_META]))
+            columns = {column: data[column] for column in data.files if column != _META}
+        return columns, meta
+
+    def load(self, name, params):
+        """
+        :return: (columns, meta) of the stored run, or None if it has not been stored
+        """
+        path = self.path(name, params)
+        if not os.path.exists(path):
+            return None
+        return self._read(path)
+
+    def entries(self):
+        """
+        Yield (file stem, columns, meta) for every stored run.
+        """
+        if not os.path.isdir(self.root):
+            return
+        for file_name in sorted(os.listdir(self.root)):
+            if file_name.endswith(".npz"):
+                columns, meta = self._read(os.path.join(self.root, file_name))
+                yield file_name[:-len(".npz")], columns, meta
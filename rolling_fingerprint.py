@@ -0,0 +1,152 @@
+#CS 5080
+#project 3 - rolling (Rabin-Karp) fingerprints to find where two payloads differ
+
+"""
+Block-level fingerprints built on fingerprint_stream. A block's fingerprint is the block read as a big-endian integer,
+mod p (the same fingerprint as fingerprint_stream, for a random prime p from prime_sampler.random_prime), so
+
+  - the fingerprint of a window sliding one byte to the right is updated in O(1) (RollingFingerprint), which finds
+    Alice's blocks anywhere in Bob's data, even when they moved (match_blocks);
+  - the fingerprint of any run of consecutive blocks follows from prefix fingerprints of the blocks, so Alice and Bob
+    can compare halves, then halves of the halves that differ, and so on (locate_differences). k differing blocks out
+    of n are found with O(k log n) fingerprints instead of sending the payload.
+"""
+
+import random
+
+import fingerprint_stream
+import prime_sampler
+
+# bytes per block (the finest resolution of locate_differences)
+BLOCK = 4096
+
+
+class RollingFingerprint:
+    """
+    Fingerprint mod p of the last `width` bytes seen, updated in O(1) per byte.
+    """
+
+    def __init__(self, p, width):
+        self.p = p
+        self.width = width
+        self._top = pow(256, width - 1, p)  # weight of the byte leaving the window
+        self.value = 0
+
+    def push(self, byte):
+        """
+        Append a byte while the window is filling up.
+        """
+        self.value = (self.value * 256 + byte) % self.p
+
+    def roll(self, out_byte, in_byte):
+        """
+        Slide the full window one byte: out_byte leaves on the left, in_byte enters on the right.
+        """
+        self.value = ((self.value - out_byte * self._top) * 256 + in_byte) % self.p
+
+    def scan(self, data):
+        """
+        Yield (offset, fingerprint of data[offset:offset + width]) for every full window of data.
+        """
+        data = memoryview(data).cast("B")
+        if len(data) < self.width:
+            return
+        self.value = 0
+        for byte in data[:self.width]:
+            self.push(byte)
+        yield 0, self.value
+        for offset in range(1, len(data) - self.width + 1):
+            self.roll(data[offset - 1], data[offset + self.width - 1])
+            yield offset, self.value
+
+
+def block_fingerprints(source, p, block=BLOCK):
+    """
+    Fingerprint of each consecutive block of source (path, bytes-like or binary file), in one streaming pass.
+    :return: (list of block fingerprints, list of block lengths)
+    """
+    hashes = []
+    lengths = []
+    for piece in fingerprint_stream._blocks(source, block):
+        hashes.append(int.from_bytes(piece, "big") % p)
+        lengths.append(len(piece))
+    return hashes, lengths
+
+
+def match_blocks(hashes, data, p, block=BLOCK):
+    """
+    Find Alice's blocks (their fingerprints `hashes`, all but the last BLOCK bytes long) anywhere in Bob's data.
+    :return: {block index: offset in data} of the full blocks found; the missing indices are Alice's mismatching blocks
+    """
+    wanted = {}
+    for i, h in enumerate(hashes):
+        wanted.setdefault(h, []).append(i)
+    found = {}
+    for offset, h in RollingFingerprint(p, block).scan(data):
+        for i in wanted.get(h, ()):
+            found.setdefault(i, offset)
+    return found
+
+
+class _Prefix:
+    # fingerprints of runs of blocks from prefix fingerprints: F[j] = F[i] * 256^(bytes in i..j) + fp(blocks i..j)
+
+    def __init__(self, hashes, lengths, p):
+        self.p = p
+        self.offsets = [0]
+        self.prefix = [0]
+        for h, length in zip(hashes, lengths):
+            self.prefix.append((self.prefix[-1] * pow(256, length, p) + h) % p)
+            self.offsets.append(self.offsets[-1] + length)
+
+    def __len__(self):
+        return len(self.prefix) - 1
+
+    def fingerprint(self, i, j):
+        """
+        Fingerprint of blocks [i, j).
+        """
+        length = self.offsets[j] - self.offsets[i]
+        return (self.prefix[j] - self.prefix[i] * pow(256, length, self.p)) % self.p
+
+
+def locate_differences(alice, bob, block=BLOCK, rng=random):
+    """
+    Simulate Alice and Bob narrowing down where their payloads differ: both fingerprint their blocks (one streaming
+    pass each) with the same random prime, then Alice sends the fingerprint of a run of blocks, Bob answers whether
+    his matches, and the runs that do not are split in two until single blocks remain.
+    :param alice, bob: paths, bytes-like objects or binary files
+    :return: (list of the differing byte ranges (lo, hi), number of fingerprints Alice sent)
+    """
+    size = max(fingerprint_stream._size_of(alice), fingerprint_stream._size_of(bob))
+    p = prime_sampler.random_prime(8 * size, rng)
+    a = _Prefix(*block_fingerprints(alice, p, block), p)
+    b = _Prefix(*block_fingerprints(bob, p, block), p)
+
+    common = min(len(a), len(b))
+    sent = 0
+    differing = []
+    runs = [(0, common)] if common else []
+    while runs:
+        i, j = runs.pop()
+        sent += 1
+        if a.offsets[j] - a.offsets[i] == b.offsets[j] - b.offsets[i] and a.fingerprint(i, j) == b.fingerprint(i, j):
+            continue
+        if j - i == 1:
+            differing.append((a.offsets[i], max(a.offsets[j], b.offsets[j])))
+            continue
+        mid = (i + j) // 2
+        runs.extend([(mid, j), (i, mid)])
+    # bytes only the longer payload has
+    if a.offsets[-1] != b.offsets[-1]:
+        differing.append((min(a.offsets[-1], b.offsets[-1]), max(a.offsets[-1], b.offsets[-1])))
+    differing.sort()
+
+    # merge neighbouring ranges
+    merged = []
+    for lo, hi in differing:
+        if merged and lo <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged, sent
@@ -0,0 +1,104 @@
+#For CS 5080, SP2025
+#project 3 - streaming rolling-window statistics for the Deliverable_2 plots
+
+"""
+Rolling false-positive rate computed over a stream of 0/1 flags. Flags arrive in chunks (NumPy arrays or any
+iterable), only the last `window` flags are kept between chunks, and the rate is only stored at every `step`-th
+position, so memory is O(window + chunk + output points) instead of O(number of flags).
+"""
+
+import numpy as np
+
+CHUNK = 1 << 20
+
+
+class RollingRate:
+    """
+    Rolling mean of 0/1 flags over the last `window` positions. Position i averages flags[max(0, i-window+1)..i], so
+    the first window-1 rates average over fewer flags (the same as a deque that grows up to `window`).
+    """
+
+    def __init__(self, window, step=1, start=0):
+        """
+        :param window: number of flags averaged
+        :param step: keep the rate at every step-th position only (1 keeps all of them)
+        :param start: x value (e.g. n) of the first flag
+        """
+        self.window = window
+        self.step = step
+        self.start = start
+        self.count = 0  # flags seen so far
+        self._tail = np.zeros(0, dtype=np.int64)  # last (up to) window flags seen
+        self._xs = []
+        self._rates = []
+
+    def feed(self, flags):
+        """
+        Add the next chunk of flags.
+        """
+        flags = np.asarray(flags, dtype=np.int64)
+        if not len(flags):
+            return
+        ext = np.concatenate([self._tail, flags])
+        cs = np.zeros(len(ext) + 1, dtype=np.int64)
+        np.cumsum(ext, out=cs[1:])
+
+        # global positions of this chunk that are kept: the multiples of step
+        first = -(-self.count // self.step) * self.step
+        positions = np.arange(first, self.count + len(flags), self.step, dtype=np.int64)
+        if len(positions):
+            ends = positions - self.count + len(self._tail) + 1  # index into cs just after each position
+            starts = np.maximum(ends - self.window, 0)
+            sizes = np.minimum(positions + 1, self.window)
+            self._xs.append(positions + self.start)
+            self._rates.append((cs[ends] - cs[starts]) / sizes)
+
+        self.count += len(flags)
+        self._tail = ext[-self.window:] if self.window else ext[:0]
+
+    def result(self):
+        """
+        :return: (xs, rates) arrays of the kept positions
+        """
+        if not self._xs:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        return np.concatenate(self._xs), np.concatenate(self._rates)
+
+
+def chunked(flags, chunk=CHUNK):
+    """
+    Group a flat iterable (e.g. a generator of 0/1 flags) into NumPy chunks.
+    """
+    buf = []
+    for flag in flags:
+        buf.append(flag)
+        if len(buf) == chunk:
+            yield np.array(buf, dtype=np.int8)
+            buf = []
+    if buf:
+        yield np.array(buf, dtype=np.int8)
+
+
+def flag_chunks(positions, lo, hi, chunk=CHUNK):
+    """
+    Yield the 0/1 flags of [lo, hi) chunk by chunk, where the flag is 1 exactly at the sorted `positions`
+    (e.g. the false positives found by mr_scan.scan_false_positives).
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    for c_lo in range(lo, hi, chunk):
+        c_hi = min(c_lo + chunk, hi)
+        flags = np.zeros(c_hi - c_lo, dtype=np.int8)
+        inside = positions[(positions >= c_lo) & (positions < c_hi)]
+        flags[inside - c_lo] = 1
+        yield flags
+
+
+def rolling_rate(chunks, window, step=1, start=0):
+    """
+    Rolling rate over a stream of flag chunks.
+    :return: (xs, rates) at every step-th position
+    """
+    rolling = RollingRate(window, step, start)
+    for flags in chunks:
+        rolling.feed(flags)
+    return rolling.result()
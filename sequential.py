@@ -0,0 +1,55 @@
+#CS 5080
+#project 3 - sequential sampling for the fingerprinting experiments
+
+"""
+Confidence-driven trial counts. Instead of a fixed number of trials per n, trials are run in batches until the Wilson
+score interval of every estimated rate is narrower than a target (e.g. +-0.005), or a maximum budget is used up. A
+rate that is clearly 0 is settled after a few hundred trials, while one that is still uncertain gets the full budget.
+"""
+
+import math
+
+# z of a two-sided 95% interval
+Z_95 = 1.959963984540054
+# trials per batch; at the default half-width (0.005) a rate of 0 stops after two batches (500 trials), the first
+# n with a Wilson interval (0, hi) narrower than 0.01 being ~380
+BATCH = 250
+
+
+def wilson_interval(successes, trials, z=Z_95):
+    """
+    Wilson score interval (lo, hi) of a rate from `successes` out of `trials`; (0.0, 1.0) when trials == 0.
+    """
+    if trials == 0:
+        return 0.0, 1.0
+    rate = successes / trials
+    z2 = z * z
+    center = (rate + z2 / (2 * trials)) / (1 + z2 / trials)
+    half = z * math.sqrt(rate * (1 - rate) / trials + z2 / (4 * trials * trials)) / (1 + z2 / trials)
+    lo = 0.0 if successes == 0 else max(center - half, 0.0)
+    hi = 1.0 if successes == trials else min(center + half, 1.0)
+    return lo, hi
+
+
+def sample_until(run_batch, max_trials, halfwidth, batch=BATCH, z=Z_95):
+    """
+    Run trials in batches until every rate's Wilson interval has a half-width <= halfwidth, or max_trials is reached.
+    :param run_batch: callable(size) running `size` new trials and returning (counts, totals): the number of successes
+        of each rate, and any other per-trial totals to add up (e.g. bits sent)
+    :return: (counts, totals, trials used, [(lo, hi) interval of each rate])
+    """
+    counts, totals, intervals = [], [], []
+    trials = 0
+    while trials < max_trials:
+        size = min(batch, max_trials - trials)
+        batch_counts, batch_totals = run_batch(size)
+        if not trials:
+            counts, totals = list(batch_counts), list(batch_totals)
+        else:
+            counts = [c + b for c, b in zip(counts, batch_counts)]
+            totals = [t + b for t, b in zip(totals, batch_totals)]
+        trials += size
+        intervals = [wilson_interval(c, trials, z) for c in counts]
+        if max(hi - lo for lo, hi in intervals) <= 2 * halfwidth:
+            break
+    return counts, totals, trials, intervals
@@ -0,0 +1,152 @@
+#For CS 5080, SP2025
+#project 3 - per-base strong probable prime bitsets shared by the Miller–Rabin experiments
+
+"""
+Persistent per-base Miller–Rabin results. For each base a, one odd-only bitmap over [0, limit] (bit i <-> 2*i + 1, the
+layout of prime_table) marks the composites that are strong probable primes to base a, i.e. exactly the n for which
+miller_rabin(n, bases=[a]) is a false positive (primes and n with a factor <= 29, which miller_rabin rejects before
+trying any base, are left out). A bitmap is computed once per base by the mr_scan engines, saved next to the prime
+table cache and memory-mapped by later runs.
+
+A composite fools a set of bases exactly when it fools each of them, so the false positives of any base set are the
+bitwise AND of the bases' bitmaps, and trying a new combination of cached bases costs a few array operations:
+
+    cache = SPRPCache(10_000_000)
+    cache.false_positives([2, 7, 61], 100, 10_000_001)   # Task 1
+    cache.scan(BASES_TO_TEST, 100, 10_000_001).index()   # Task 2, base 2 is not tested again
+    cache.false_positives([31, 73])                      # only base 73 is new, one scan for it
+
+The bitmaps are written and read through memory maps one mr_scan.CHUNK window at a time, so memory is bounded by the
+window (plus the liars found) whatever the limit; each bitmap takes limit / 16 bytes of disk.
+"""
+
+import numpy as np
+
+import mr_scan
+import prime_table
+from prime_table import CACHE_DIR, _cache_path, _cached_limits, _new_cached, _store_cached, _unpack_odd
+
+
+def _prefix(a):
+    return f"sprp_{a}_"
+
+
+class SPRPCache:
+    """
+    Strong probable prime bitmaps of any number of bases over [0, limit], loaded from the cache or computed (all the
+    missing bases in one scan) the first time a base is used.
+    :param workers: processes the scans of missing bases are sharded over (see mr_scan.scan_liars)
+    :param ground_truth: callable(limit) giving the primality table of those scans; only called when a base is missing
+    """
+
+    def __init__(self, limit, cache_dir=CACHE_DIR, workers=1, ground_truth=prime_table.ground_truth):
+        self.limit = max(limit, 64)
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.ground_truth = ground_truth
+        self._bits = {}
+
+    def _load(self, a):
+        # the smallest cached bitmap of base a covering the limit, else the largest one below it (to be extended)
+        limits = _cached_limits(self.cache_dir, _prefix(a))
+        covering = [limit for limit in limits if limit >= self.limit]
+        if covering:
+            return np.load(_cache_path(self.cache_dir, min(covering), _prefix(a)), mmap_mode="r"), True
+        if limits:
+            return np.load(_cache_path(self.cache_dir, max(limits), _prefix(a)), mmap_mode="r"), False
+        return np.zeros(0, dtype=np.uint8), False
+
+    def ensure(self, bases, progress=None):
+        """
+        Make sure the bitmaps of all the bases are available, scanning once for the ones not cached up to the limit.
+        A bitmap cached up to a smaller limit is only extended: the scan starts where it ends.
+        :param progress: optional callable, given the number of integers scanned so far
+        """
+        partial = {}
+        for a in dict.fromkeys(bases):
+            if a in self._bits:
+                continue
+            bits, complete = self._load(a)
+            if complete:
+                self._bits[a] = bits
+            else:
+                partial[a] = bits
+        if not partial:
+            return
+
+        # the last byte of a shorter bitmap may cover numbers past its limit, so it is recomputed
+        keep = {a: max(len(bits) - 1, 0) for a, bits in partial.items()}
+        lo = 16 * min(keep.values())
+        missing = list(partial)
+        scan = mr_scan.scan_liars(lo, self.limit + 1, missing, self.ground_truth(self.limit), workers=self.workers,
+                                  progress=progress)
+        ns = np.array(scan.ns, dtype=np.int64)
+        masks = np.array(scan.masks, dtype=np.int64)
+        size = ((self.limit + 1) // 2 + 7) >> 3
+        for j, a in enumerate(missing):
+            path = _cache_path(self.cache_dir, self.limit, _prefix(a))
+            bits = _new_cached(path, size)
+            for b_lo in range(0, keep[a], mr_scan.CHUNK):
+                b_hi = min(b_lo + mr_scan.CHUNK, keep[a])
+                bits[b_lo:b_hi] = partial[a][b_lo:b_hi]
+            # liars are sparse, so their bits are set in the bitmap directly
+            i = ns[(masks >> j) & 1 == 1] >> 1
+            i = i[i >= 8 * keep[a]]
+            np.bitwise_or.at(bits, i >> 3, (1 << (i & 7)).astype(np.uint8))
+            self._bits[a] = _store_cached(path, bits)
+
+    def bits(self, a):
+        """
+        The packed (little bit order) uint8 bitmap of base a: bit i set iff 2*i + 1 is a false positive of base a.
+        """
+        self.ensure([a])
+        return self._bits[a]
+
+    def _windows(self, bases, lo, hi):
+        # (w_lo, [flags of the odd numbers of [w_lo, w_hi) for each base]) for consecutive windows of [lo, hi)
+        for w_lo in range(lo, hi, mr_scan.CHUNK):
+            w_hi = min(w_lo + mr_scan.CHUNK, hi)
+            yield w_lo, [_unpack_odd(self._bits[a], w_lo, w_hi) for a in bases]
+
+    def _range(self, lo, hi):
+        hi = self.limit + 1 if hi is None else hi
+        if hi - 1 > self.limit:
+            raise ValueError(f"{hi - 1} is beyond the SPRP cache limit {self.limit}")
+        return max(lo, 0), hi
+
+    def false_positives(self, bases, lo=0, hi=None, progress=None):
+        """
+        Every composite n in [lo, hi) that miller_rabin(n, bases=bases) reports as probably prime: the AND of the
+        bases' bitmaps. Same result as mr_scan.scan_false_positives.
+        :return: sorted int64 array of the false positives
+        """
+        lo, hi = self._range(lo, hi)
+        bases = list(bases)
+        self.ensure(bases, progress)
+        if not bases:
+            return np.zeros(0, dtype=np.int64)
+        fp_ns = [np.zeros(0, dtype=np.int64)]
+        for w_lo, flags in self._windows(bases, lo, hi):
+            fp_ns.append(np.flatnonzero(np.logical_and.reduce(flags)).astype(np.int64) * 2 + (w_lo | 1))
+        return np.concatenate(fp_ns)
+
+    def scan(self, bases, lo=0, hi=None, progress=None):
+        """
+        The liars in [lo, hi) of any of the bases with their base bitmasks, as mr_scan.scan_liars would return them.
+        :return: mr_scan.LiarScan
+        """
+        lo, hi = self._range(lo, hi)
+        bases = list(bases)
+        if len(bases) > 63:
+            raise ValueError("at most 63 bases fit in a mask")
+        self.ensure(bases, progress)
+        ns = []
+        masks = []
+        for w_lo, flags in self._windows(bases, lo, hi):
+            offsets = np.flatnonzero(np.logical_or.reduce(flags))
+            window_masks = np.zeros(len(offsets), dtype=np.int64)
+            for j, base_flags in enumerate(flags):
+                window_masks |= base_flags[offsets].astype(np.int64) << j
+            ns.extend((offsets.astype(np.int64) * 2 + (w_lo | 1)).tolist())
+            masks.extend(window_masks.tolist())
+        return mr_scan.LiarScan(bases, lo, hi, ns, masks)
@@ -0,0 +1,100 @@
+#CS 5080
+#project 3 - parallel n sweeps for the fingerprinting experiments
+
+"""
+Runs an experiment function for every n of a sweep, optionally on a process pool. Every n gets its own
+random.Random stream derived from (seed, n), so a run gives the same results whatever the number of workers or the
+order the blocks finish in. Consecutive n are sent to a worker as one block, which keeps per-process caches that
+are updated incrementally in n (like fingerprinting_setup.AdversarialProduct) effective.
+"""
+
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# blocks per worker; more than 1 so workers that get the cheap (small n) blocks do not sit idle at the end
+BLOCKS_PER_WORKER = 4
+# number of n computed between two saves of a stored sweep
+CHECKPOINT_EVERY = 100
+
+
+def rng_for(seed, n):
+    """
+    The random stream used for n in a sweep seeded with seed.
+    """
+    return random.Random(f"{seed}:{n}")
+
+
+def _run_block(fn, block, args, seed):
+    return [fn(n, *args, rng=rng_for(seed, n)) for n in block]
+
+
+def _blocks(ns, count):
+    size = max(-(-len(ns) // max(count, 1)), 1)
+    return [ns[i:i + size] for i in range(0, len(ns), size)]
+
+
+def run_sweep(fn, ns, args=(), seed=None, workers=1, progress=None):
+    """
+    Evaluate fn(n, *args, rng=<stream for n>) for every n.
+    :param fn: module level function (it is pickled to the workers)
+    :param seed: base seed of the per-n streams; None draws one from the global random module
+    :param workers: number of processes, 1 runs in this process
+    :param progress: optional callable, given the number of n done so far
+    :return: list of the results, in the order of ns
+    """
+    ns = list(ns)
+    if seed is None:
+        seed = random.randrange(2**63)
+    results = []
+    if workers > 1:
+        blocks = _blocks(ns, workers * BLOCKS_PER_WORKER)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_run_block, fn, block, args, seed) for block in blocks]
+            for future in futures:
+                results.extend(future.result())
+                if progress is not None:
+                    progress(len(results))
+    else:
+        for n in ns:
+            results.append(fn(n, *args, rng=rng_for(seed, n)))
+            if progress is not None:
+                progress(len(results))
+    return results
+
+
+def run_stored_sweep(store, name, params, columns, fn, ns, args=(), seed=None, workers=1, progress=None,
+                     checkpoint_every=CHECKPOINT_EVERY):
+    """
+    run_sweep whose results are saved to a result_store.ResultStore under (name, params) every checkpoint_every n.
+    If a run with the same parameters was interrupted, the n it already finished are loaded instead of recomputed
+    (with the seed it used, so the resumed run matches an uninterrupted one).
+    :param columns: names of the values fn returns, in order
+    :return: {"n": array of ns, column: array of that value per n}
+    """
+    ns = list(ns)
+    done = {column: [] for column in ["n"] + columns}
+    stored = store.load(name, params) if store is not None else None
+    if stored is not None:
+        stored_columns, meta = stored
+        stored_ns = stored_columns["n"].tolist()
+        if stored_ns == ns[:len(stored_ns)]:
+            done = {column: stored_columns[column].tolist() for column in done}
+            seed = meta.get("seed", seed)
+    if seed is None:
+        seed = random.randrange(2**63)
+
+    start = len(done["n"])
+    if progress is not None:
+        progress(start)
+    for i in range(start, len(ns), checkpoint_every):
+        block = ns[i:i + checkpoint_every]
+        block_progress = None if progress is None else (lambda k, i=i: progress(i + k))
+        for n, values in zip(block, run_sweep(fn, block, args, seed, workers, block_progress)):
+            done["n"].append(n)
+            for column, value in zip(columns, values):
+                done[column].append(value)
+        if store is not None:
+            store.save(name, params, done, complete=len(done["n"]) == len(ns), seed=seed)
+    return {column: np.asarray(values) for column, values in done.items()}